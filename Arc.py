@@ -1,3 +1,8 @@
+from array import array
+
+import numpy as np
+
+
 ## 弧集合
 class Arc():
     def __init__(self, trainBelong, staBelong_preSta, staBelong_next, timeBelong_pre, timeBelong_next, arc_length):
@@ -13,9 +18,299 @@ class Arc():
         self.before_occupy_arr = 1  # 前1
         self.after_occupy_arr = 2  # 后2
         self.node_occupied = []  # 该弧参与的约束的集合，约束此时已经转为node-related，所以以node的乘子来表示约束的乘子
+        self.index = None  # 在弧-节点关联矩阵(ArcNodeIncidence)中的编号
 
     def __repr__(self):
         pre_t = str(self.timeBelong_pre)
         next_t = str(self.timeBelong_next)
         return self.trainBelong + ": " + self.staBelong_pre + "(" + pre_t + ") => " + self.staBelong_next + "(" + next_t \
                + ")"
+
+
+# 弧的列存储（struct-of-arrays），代替每条弧一个Arc对象；ArcView提供与Arc相同的属性访问
+class ArcStore():
+    columns = {  # 列名: array typecode
+        'train': 'i', 'layer': 'i',  # 所属列车编号；所在区间/车站在 train.v_staList 中的位置（弧由 v_staList[layer] 流向 v_staList[layer + 1]）
+        'tail_sta': 'i', 'tail_t': 'i', 'head_sta': 'i', 'head_t': 'i',  # 首尾节点，车站存 station_names 中的编号
+        'span': 'i', 'arc_length': 'i',  # span 为 Train.arcs 第三层字典的key（源节点流出弧为t，其余即弧长）
+        'chosen': 'b',
+        'before_occupy_dep': 'b', 'after_occupy_dep': 'b', 'before_occupy_arr': 'b', 'after_occupy_arr': 'b',
+    }
+
+    def __init__(self):
+        self.train_names = []
+        self.station_names = []
+        self._train_id = {}
+        self._station_id = {}
+        self.train_ranges = []  # 各列车的弧在store中连续存放: [lo, hi)
+        self.train_template = []  # 各列车共用其弧的列车编号（见 Train.share_arcs），自己建弧的为自身
+        self._buffers = {name: array(code) for name, code in self.columns.items()}
+        self._node_occupied = {}  # 兼容 Arc.node_occupied，只给访问过的弧建列表
+        self.frozen = False
+
+    def __len__(self):
+        return len(self.train) if self.frozen else len(self._buffers['train'])
+
+    def __getitem__(self, i):
+        return ArcView(self, i)
+
+    def station_id(self, sta):
+        if sta not in self._station_id:
+            self._station_id[sta] = len(self.station_names)
+            self.station_names.append(sta)
+        return self._station_id[sta]
+
+    def add_train(self, traNo, template=None):
+        '''
+        start the arcs of a new train, all its arcs must be added before the next train
+        :param template: id of an earlier train whose arcs this train shares, no arcs are added for it then
+        :return: train id
+        '''
+        train_id = len(self.train_names)
+        self._train_id[traNo] = train_id
+        self.train_names.append(traNo)
+        if template is None:
+            self.train_ranges.append([len(self), len(self)])
+            self.train_template.append(train_id)
+        else:
+            self.train_ranges.append(self.train_ranges[template])  # 同一个列表，弧范围始终一致
+            self.train_template.append(template)
+        return train_id
+
+    def add(self, train_id, layer, staBelong_pre, staBelong_next, timeBelong_pre, timeBelong_next, span, arc_length,
+            occupy=None):
+        '''
+        append one arc, arcs of a train must come in (layer, t, span) order
+        :param occupy: (before_occupy_dep, after_occupy_dep, before_occupy_arr, after_occupy_arr), None for the Arc
+                       defaults
+        :return: arc id
+        '''
+        arc_id = len(self)
+        row = (train_id, layer, self.station_id(staBelong_pre), timeBelong_pre, self.station_id(staBelong_next),
+               timeBelong_next, span, arc_length, 0) + (occupy or (1, 2, 1, 2))  # 占用参数默认与 Arc 一致: 前1后2
+        for buffer, value in zip(self._buffers.values(), row):
+            buffer.append(value)
+        self.train_ranges[train_id][1] = arc_id + 1
+        return arc_id
+
+    def freeze(self):
+        '''
+        turn the append buffers into numpy columns
+        :return:
+        '''
+        for name, buffer in self._buffers.items():
+            setattr(self, name, np.frombuffer(buffer, dtype=buffer.typecode).copy())
+        self._buffers = None
+        self.frozen = True
+        self._build_key()
+        return self
+
+    def compact(self, keep):
+        '''
+        drop arcs from a frozen store, the kept arcs are numbered again in the same order
+        :param keep: bool array over the arcs
+        :return:
+        '''
+        for name in self.columns:
+            setattr(self, name, getattr(self, name)[keep])
+        counts = np.bincount(self.train, minlength=len(self.train_names))
+        ends = np.cumsum(counts).tolist()
+        counts = counts.tolist()
+        for train_id, template in enumerate(self.train_template):
+            if template == train_id:  # 共用弧的列车与之是同一个列表
+                self.train_ranges[train_id][:] = [ends[train_id] - counts[train_id], ends[train_id]]
+        self._node_occupied = {}
+        self._build_key()
+        return self
+
+    @classmethod
+    def from_columns(cls, columns, train_names, station_names, train_ranges):
+        '''
+        frozen store from columns saved earlier (see network_cache)
+        :param columns: dict, column name => numpy array
+        :return:
+        '''
+        store = cls()
+        store.train_names = list(train_names)
+        store.station_names = list(station_names)
+        store._train_id = {traNo: i for i, traNo in enumerate(store.train_names)}
+        store._station_id = {sta: i for i, sta in enumerate(store.station_names)}
+        store.train_ranges = []
+        first = {}  # 弧范围相同的非空范围视为共用弧
+        for train_id, r in enumerate(train_ranges):
+            r = tuple(r)
+            template = first.setdefault(r, train_id) if r[0] < r[1] else train_id
+            store.train_ranges.append(store.train_ranges[template] if template != train_id else list(r))
+            store.train_template.append(template)
+        for name, code in cls.columns.items():
+            setattr(store, name, np.asarray(columns[name], dtype=code))
+        store._buffers = None
+        store.frozen = True
+        store._build_key()
+        return store
+
+    def _build_key(self):
+        # (layer, t, span) 在每列车内有序，编码后可二分查找
+        t_size = int(self.tail_t.max()) + 2 if len(self) > 0 else 1
+        span_size = int(self.span.max()) + 1 if len(self) > 0 else 1
+        self._key = (self.layer.astype(np.int64) * t_size + self.tail_t + 1) * span_size + self.span
+        self._t_size = t_size
+        self._span_size = span_size
+
+    def find(self, train_id, layer, t, span=None):
+        '''
+        arc ids of a train at (layer, t[, span])
+        :return: [lo, hi) range in the store
+        '''
+        lo, hi = self.train_ranges[train_id]
+        if span is None:
+            key_lo = (layer * self._t_size + t + 1) * self._span_size
+            key_hi = key_lo + self._span_size
+        else:
+            key_lo = (layer * self._t_size + t + 1) * self._span_size + span
+            key_hi = key_lo + 1
+        keys = self._key[lo:hi]
+        return lo + int(np.searchsorted(keys, key_lo)), lo + int(np.searchsorted(keys, key_hi))
+
+    def node_occupied(self, i):
+        return self._node_occupied.setdefault(i, [])
+
+
+class ArcView():
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index  # 在store中的编号，同时也是在弧-节点关联矩阵中的编号
+
+    @property
+    def trainBelong(self):
+        return self.store.train_names[self.store.train[self.index]]
+
+    @property
+    def staBelong_pre(self):
+        return self.store.station_names[self.store.tail_sta[self.index]]
+
+    @property
+    def staBelong_next(self):
+        return self.store.station_names[self.store.head_sta[self.index]]
+
+    @property
+    def timeBelong_pre(self):
+        return int(self.store.tail_t[self.index])
+
+    @property
+    def timeBelong_next(self):
+        return int(self.store.head_t[self.index])
+
+    @property
+    def arc_length(self):
+        return int(self.store.arc_length[self.index])
+
+    @property
+    def isChosen_LR(self):
+        return int(self.store.chosen[self.index])
+
+    @isChosen_LR.setter
+    def isChosen_LR(self, value):
+        self.store.chosen[self.index] = value
+
+    @property
+    def before_occupy_dep(self):
+        return int(self.store.before_occupy_dep[self.index])
+
+    @property
+    def after_occupy_dep(self):
+        return int(self.store.after_occupy_dep[self.index])
+
+    @property
+    def before_occupy_arr(self):
+        return int(self.store.before_occupy_arr[self.index])
+
+    @property
+    def after_occupy_arr(self):
+        return int(self.store.after_occupy_arr[self.index])
+
+    @property
+    def node_occupied(self):
+        return self.store.node_occupied(self.index)
+
+    def __repr__(self):
+        return Arc.__repr__(self)
+
+
+class StoredTrainArcs():
+    '''
+    read-only stand-in for Train.arcs (dep-arr => t => span => arc) on top of an ArcStore
+    '''
+    def __init__(self, store, train_id, v_staList):
+        self.store = store
+        self.train_id = train_id
+        self.layers = {(v_staList[i], v_staList[i + 1]): i for i in range(len(v_staList) - 1)}
+
+    def __getitem__(self, sec):
+        return StoredSectionArcs(self.store, self.train_id, self.layers[sec])
+
+    def __contains__(self, sec):
+        return sec in self.layers
+
+    def __iter__(self):
+        return iter(self.layers)
+
+    def __len__(self):
+        return len(self.layers)
+
+    def keys(self):
+        return self.layers.keys()
+
+    def values(self):
+        return (self[sec] for sec in self.layers)
+
+    def items(self):
+        return ((sec, self[sec]) for sec in self.layers)
+
+
+class StoredSectionArcs():
+    '''
+    t => {span: ArcView} of one section, the inner dicts are built on access
+    '''
+    def __init__(self, store, train_id, layer):
+        self.store = store
+        self.train_id = train_id
+        self.layer = layer
+        self.lo, self.hi = store.find(train_id, layer, -1)[0], store.find(train_id, layer + 1, -1)[0]
+
+    def __getitem__(self, t):
+        lo, hi = self.store.find(self.train_id, self.layer, t)
+        if lo == hi:
+            raise KeyError(t)
+        return {int(self.store.span[i]): ArcView(self.store, i) for i in range(lo, hi)}
+
+    def __contains__(self, t):
+        lo, hi = self.store.find(self.train_id, self.layer, t)
+        return lo < hi
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return list(dict.fromkeys(self.store.tail_t[self.lo:self.hi].tolist()))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def values(self):
+        return (arcs_t for _, arcs_t in self.items())
+
+    def items(self):
+        arcs_t = {}
+        last_t = None
+        for i, t, span in zip(range(self.lo, self.hi), self.store.tail_t[self.lo:self.hi].tolist(),
+                              self.store.span[self.lo:self.hi].tolist()):
+            if t != last_t and last_t is not None:
+                yield last_t, arcs_t
+                arcs_t = {}
+            arcs_t[span] = ArcView(self.store, i)
+            last_t = t
+        if last_t is not None:
+            yield last_t, arcs_t
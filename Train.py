@@ -1,11 +1,12 @@
 # Here defines the info about the trains
-import copy
-
 from Arc import *
-import networkx as nx
+from adjacency import build_adjacency
+import numpy as np
 ## 所有的arc取值就是0或1，即选或不选
 
 class Train():
+    build_subgraph = True  # False 时不建 networkx 子图，网络用 adjacency() 的CSR数组表示，to_networkx() 按需转换
+
     def __init__(self, traNo, dep_LB, dep_UB):
         '''
         construct
@@ -21,6 +22,9 @@ class Train():
         self.start_addTime = 2  # 起车附加时分
         self.min_dwellTime = 2  # 最小停站时分
         self.max_dwellTime = 6  # 最大停站时分
+        self.time_scale = 1  # 一个时间格代表的分钟数，粗粒度求解时大于1
+        self.headway = None  # 弧的节点占用 (before_occupy_dep, after_occupy_dep, before_occupy_arr, after_occupy_arr)，None 为 Arc 默认值
+        self.corridor = None  # 各 virtual station 允许的时刻范围 {sta: (lo, hi)}，None 为不限制
         self.secTimes = {}
         self.right_time_bound = {}  # 各站通过线路时间窗和列车始发时间窗综合确定的右侧边界
         self.depSta = None
@@ -29,15 +33,26 @@ class Train():
         self.staList = []  # actual stations
         self.linePlan = {}  # 开行方案字典
         self.opt_path_LR = None # LR 中的最短路径
-        self.last_opt_path_LR = None
+        self.opt_arcs_LR = ()  # LR 最短路径上的弧，arc.index 的元组
         self.opt_cost_LR = 0
         self.feasible_path = None # 可行解中的最短路径
-        self.last_feasible_path = None # 上一个可行解的最短路径，用于置0
+        self.last_feasible_arcs = () # 上一个可行解路径上的弧（arc.index 的元组），用于置0
         self.feasible_cost = 0
+        self.feasible_key = None # 求可行路径时的LR路径（opt_arcs_LR），沿用上一轮可行路径时用来判断
         self.timetable = {} # 以virtual station为key，存int值
         self.speed = None # 列车速度，300,350
-        self.subgraph = nx.DiGraph(traNo=self.traNo)  # subgraph for each train
+        self.subgraph = None  # subgraph for each train, only if build_subgraph
+        if self.build_subgraph:
+            import networkx as nx
+            self.subgraph = nx.DiGraph(traNo=self.traNo)
+        self._adjacency = None  # adjacency() 的缓存
+        self._adjacency_range = None  # 缓存时该列车弧的编号范围
+        self.resources = ()  # 最短路的附加资源（labelling.Resource），为空时用不带资源的DAG最短路
         self._subgraph_backup = None  # copy the original network
+        self.arc_store = None  # 列存储模式下弧所在的ArcStore
+        self.store_id = None  # 在ArcStore中的列车编号
+        self.arc_range = None  # 对象模式下该列车的弧在关联矩阵中的编号范围 [lo, hi)
+        self.template = None  # 共用其弧的列车（见 share_arcs），自己建弧时为None
 
     def __repr__(self):
         return "train" + str(self.traNo)
@@ -59,7 +74,7 @@ class Train():
                 self.v_staList.append(self.staList[i] + '_')
         self.v_staList.append('_t')
 
-    def create_arcs_LR(self, secTimes, TimeSpan):
+    def create_arcs_LR(self, secTimes, TimeSpan, arc_store=None, templates=None):
         self.depSta = self.staList[0]
         self.arrSta = self.staList[-1]
         self.secTimes = secTimes
@@ -69,8 +84,22 @@ class Train():
         :param v_staList:
         :param secTimes:
         :param model:
+        :param arc_store: ArcStore, if given the arcs are appended to it instead of creating Arc objects,
+                          and self.arcs becomes a read-only view once the store is frozen
+        :param templates: dict template_key => Train, shared by the trains of one network; a train whose key is
+                          already there shares the arcs of that train instead of creating its own
         :return:
         '''
+        key = self.template_key(TimeSpan) if templates is not None else None
+        if key is not None:
+            if key in templates:
+                self.share_arcs(templates[key])
+                return
+            templates[key] = self
+        if arc_store is not None:
+            self.arc_store = arc_store
+            self.store_id = arc_store.add_train(self.traNo)
+            self._layer = {sta: i for i, sta in enumerate(self.v_staList)}
         minArr = self.dep_LB  # for curSta(judge by dep)
         '''
         create arcs involving node s
@@ -78,7 +107,7 @@ class Train():
         self.arcs['s_', self.staList[0] + '_'] = {}
         self.arcs['s_', self.staList[0] + '_'][-1] = {}  # source node流出弧, 只有t=-1，因为source node与时间无关
         for t in range(minArr, self.right_time_bound[self.v_staList[1]]):
-            self.arcs['s_', self.staList[0] + '_'][-1][t] = Arc(self.traNo, 's_', self.staList[0] + '_', -1, t, 0)
+            self._add_arc('s_', self.staList[0] + '_', -1, t, t, 0)
             # 声明弧长为t，实际length为0
         '''
         create arcs between real stations
@@ -106,8 +135,8 @@ class Train():
             for t in range(minArr, self.right_time_bound[curSta_dep]):
                 if t + secRunTime >= self.right_time_bound[nextSta_arr]:  # 范围为0 => TimeSpan - 1
                     break
-                self.arcs[curSta_dep, nextSta_arr][t] = {}  # dep-arr在node t的弧集，固定区间运行时分默认只有一个元素
-                self.arcs[curSta_dep, nextSta_arr][t][secRunTime] = Arc(self.traNo, curSta_dep, nextSta_arr, t, t+secRunTime, secRunTime)
+                # dep-arr在node t的弧集，固定区间运行时分默认只有一个元素
+                self._add_arc(curSta_dep, nextSta_arr, t, secRunTime, t + secRunTime, secRunTime)
             # update cur time window
             minArr += secRunTime
 
@@ -122,15 +151,13 @@ class Train():
                 for t in range(minArr, self.right_time_bound[nextSta_arr]):
                     if t + self.min_dwellTime >= self.right_time_bound[nextSta_dep]:  # 当前t加上最短停站时分都超了，break掉
                         break
-                    self.arcs[nextSta_arr, nextSta_dep][t] = {}
                     for span in range(self.min_dwellTime, self.max_dwellTime):
                         if t + span >= self.right_time_bound[nextSta_dep]:
                             break
-                        self.arcs[nextSta_arr, nextSta_dep][t][span] = Arc(self.traNo, nextSta_arr, nextSta_dep, t, t+span, span)
+                        self._add_arc(nextSta_arr, nextSta_dep, t, span, t + span, span)
             else: # 该站不停车，只创建一个竖直弧，长度为0
                 for t in range(minArr, self.right_time_bound[nextSta_arr]):
-                    self.arcs[nextSta_arr, nextSta_dep][t] = {}
-                    self.arcs[nextSta_arr, nextSta_dep][t][0] = Arc(self.traNo, nextSta_arr, nextSta_dep, t, t, 0)
+                    self._add_arc(nextSta_arr, nextSta_dep, t, 0, t, 0)
             # update cur time window
             minArr += self.min_dwellTime
 
@@ -139,31 +166,203 @@ class Train():
         '''
         self.arcs['_' + self.staList[-1], '_t'] = {}
         for t in range(minArr, self.right_time_bound[self.v_staList[-2]]):
-            self.arcs['_' + self.staList[-1], '_t'][t] = {}  # dep-arr在node t的弧集，固定区间运行时分默认只有一个元素
-            self.arcs['_' + self.staList[-1], '_t'][t][0] = Arc(self.traNo, self.staList[-1], '_t', t, -1, 0)
+            # dep-arr在node t的弧集，固定区间运行时分默认只有一个元素
+            self._add_arc('_' + self.staList[-1], '_t', t, 0, -1, 0, staBelong_pre=self.staList[-1])
 
+        if arc_store is not None:
+            self.arcs = StoredTrainArcs(arc_store, self.store_id, self.v_staList)
 
+    def template_key(self, TimeSpan):
+        '''
+        everything the arcs of create_arcs_LR depend on: stop pattern, run times, speed, departure window, time span
+        and the time grid; None if the train has a corridor of its own
+        :param TimeSpan:
+        :return:
+        '''
+        if self.corridor is not None:
+            return None
+        return (tuple((sta, self.linePlan[sta]) for sta in self.staList),
+                tuple(self.secTimes[self.staList[i], self.staList[i + 1]] for i in range(len(self.staList) - 1)),
+                self.speed, self.dep_LB, self.dep_UB, TimeSpan, self.time_scale, self.headway, self.stop_addTime,
+                self.start_addTime, self.min_dwellTime, self.max_dwellTime)
+
+    def share_arcs(self, template):
+        '''
+        use the arcs of template (same template_key) instead of a copy, only the per-train solution state
+        (opt_arcs_LR, feasible path, ...) stays with this train
+        :param template: Train with its arcs created
+        :return:
+        '''
+        self.template = template
+        self.right_time_bound = template.right_time_bound
+        if template.arc_store is not None:
+            self.arc_store = template.arc_store
+            self.store_id = self.arc_store.add_train(self.traNo, template.store_id)
+            self._layer = template._layer
+            self.arcs = StoredTrainArcs(self.arc_store, self.store_id, self.v_staList)
+        else:
+            self.arcs = template.arcs
+
+    def attach_arc_store(self, secTimes, TimeSpan, arc_store, store_id, template=None):
+        '''
+        same state as create_arcs_LR in store mode, for arcs that are already in arc_store (e.g. loaded from cache)
+        :param store_id: train id in arc_store
+        :param template: Train whose arcs this train shares (see share_arcs), None if the arcs are its own
+        :return:
+        '''
+        self.depSta = self.staList[0]
+        self.arrSta = self.staList[-1]
+        self.secTimes = secTimes
+        self.truncate_train_time_bound(TimeSpan)
+        self.arc_store = arc_store
+        self.store_id = store_id
+        self.template = template
+        self.arcs = StoredTrainArcs(arc_store, store_id, self.v_staList)
 
-    def update_arc_chosen(self):
+    def _add_arc(self, dep, arr, t, span, t_next, arc_length, staBelong_pre=None):
         '''
-        通过获取的opt_path，将路径中包含的弧的 isChosen 属性更新
+        add arc dep(t) => arr(t_next) to self.arcs[dep, arr][t][span], or append it to the arc store
+        :param staBelong_pre: name stored on the Arc object if it differs from dep
         :return:
         '''
-        # 先把上一轮的path清零
-        # 内含弧两个边界点的key：[dep, arr], value为弧集字典(key: [t], value: arc字典, key为arc_length) 三层字典嵌套: dep-arr => t => span
-        if self.last_opt_path_LR is not None: # 第一轮循环还没有，不用设为0
-            for node_id in range(1, len(self.last_opt_path_LR.node_passed) - 2):
-                node_name = self.last_opt_path_LR.node_passed[node_id]
-                next_node_name = self.last_opt_path_LR.node_passed[node_id + 1]
-                self.arcs[node_name[0], next_node_name[0]][node_name[1]][next_node_name[1] - node_name[1]].isChosen_LR = 0
+        if self.corridor is not None:  # 首尾节点须在时刻范围内，源/汇节点不限
+            if dep in self.corridor and not self.corridor[dep][0] <= t <= self.corridor[dep][1]:
+                return
+            if arr in self.corridor and not self.corridor[arr][0] <= t_next <= self.corridor[arr][1]:
+                return
+        if self.arc_store is not None:
+            self.arc_store.add(self.store_id, self._layer[dep], dep, arr, t, t_next, span, arc_length, self.headway)
+        else:
+            arc = Arc(self.traNo, staBelong_pre or dep, arr, t, t_next, arc_length)
+            if self.headway is not None:
+                arc.before_occupy_dep, arc.after_occupy_dep, arc.before_occupy_arr, arc.after_occupy_arr = self.headway
+            self.arcs[dep, arr].setdefault(t, {})[span] = arc
+
+    def scale_time(self, factor):
+        '''
+        coarse time grid of factor minutes per step: run time additions, dwell times and headways are divided by
+        factor and rounded up, so a coarse path is never shorter than the 1-minute one
+        :param factor:
+        :return:
+        '''
+        self.time_scale = factor
+        self.stop_addTime = -(-self.stop_addTime // factor)
+        self.start_addTime = -(-self.start_addTime // factor)
+        self.min_dwellTime = -(-self.min_dwellTime // factor)
+        self.max_dwellTime = max(-(-self.max_dwellTime // factor), self.min_dwellTime + 1)
+        arc = Arc(self.traNo, None, None, 0, 0, 0)
+        self.headway = tuple(-(-h // factor) for h in (arc.before_occupy_dep, arc.after_occupy_dep,
+                                                       arc.before_occupy_arr, arc.after_occupy_arr))
+
+    def earliest_offsets(self, secTimes):
+        '''
+        least time from the departure to every virtual station, with the shortest dwell at every stop
+        :param secTimes:
+        :return: {sta: offset}
+        '''
+        offsets = {self.v_staList[1]: 0}
+        elapsed = 0
+        for i in range(len(self.staList) - 1):
+            curSta = self.staList[i]
+            nextSta = self.staList[i + 1]
+            elapsed += secTimes[curSta, nextSta] + self.stop_addTime
+            if self.linePlan[curSta] == 1:
+                elapsed += self.start_addTime
+            offsets['_' + nextSta] = elapsed
+            if i + 1 == len(self.staList) - 1:
+                break
+            if self.linePlan[nextSta] == 1:
+                elapsed += self.min_dwellTime
+            offsets[nextSta + '_'] = elapsed
+        return offsets
+
+    def add_subgraph_edge(self, arc):
+        '''
+        record an arc in the networkx subgraph, no-op when the subgraph is not built
+        '''
+        if self.subgraph is not None:
+            self.subgraph.add_edge((arc.staBelong_pre, arc.timeBelong_pre), (arc.staBelong_next, arc.timeBelong_next),
+                                   weight=arc.arc_length)
+
+    def adjacency(self):
+        '''
+        CSR adjacency arrays of the train network (see adjacency.TrainAdjacency), built after the arcs and rebuilt
+        when the arcs are numbered again
+        :return:
+        '''
+        if self.template is not None:  # 共用弧的列车也共用邻接数组
+            return self.template.adjacency()
+        arc_range = self.arc_range if self.arc_store is None else tuple(self.arc_store.train_ranges[self.store_id])
+        if self._adjacency is None or self._adjacency_range != arc_range:  # 弧重新编号后重建
+            self._adjacency = build_adjacency(self)
+            self._adjacency_range = arc_range
+        return self._adjacency
+
+    def prune_dead_arcs(self):
+        '''
+        remove the arcs on no source-sink path (see TrainAdjacency.live_arcs) from self.arcs, object mode only;
+        in store mode the arcs are dropped by ArcStore.compact
+        :return: removed arcs as (dep, arr, t, span, arc)
+        '''
+        if self.template is not None:  # 弧由 template 删
+            return []
+        adj = self.adjacency()
+        live = adj.live_arcs()
+        if live.all():
+            return []
+        dead = {id(adj.arcs[i]) for i in np.flatnonzero(~live).tolist()}
+        removed = []
+        for (dep, arr), arcs_sec in self.arcs.items():
+            for t in list(arcs_sec.keys()):
+                arcs_t = arcs_sec[t]
+                for span in [span for span, arc in arcs_t.items() if id(arc) in dead]:
+                    removed.append((dep, arr, t, span, arcs_t.pop(span)))
+                if not arcs_t:
+                    del arcs_sec[t]
+        self._adjacency = None
+        return removed
+
+    def to_networkx(self):
+        '''
+        the train network as nx.DiGraph, for debugging; converted from adjacency() when no subgraph was built
+        :return:
+        '''
+        if self.subgraph is not None:
+            return self.subgraph
+        return self.adjacency().to_networkx(self.traNo)
 
-        # 再把这一轮的设为1
+    def path_arcs(self, node_passed):
+        '''
+        arcs on a path as an immutable tuple of arc.index, source and sink arcs excluded (they occupy no node)
+        :param node_passed: node names [sta, t] from source to sink
+        :return:
+        '''
         # 内含弧两个边界点的key：[dep, arr], value为弧集字典(key: [t], value: arc字典, key为arc_length) 三层字典嵌套: dep-arr => t => span
-        for node_id in range(1, len(self.opt_path_LR.node_passed) - 2):
-            node_name = self.opt_path_LR.node_passed[node_id]
-            next_node_name = self.opt_path_LR.node_passed[node_id + 1]
-            self.arcs[node_name[0], next_node_name[0]][node_name[1]][next_node_name[1] - node_name[1]].isChosen_LR = 1
-        self.last_opt_path_LR = copy.deepcopy(self.opt_path_LR)  #将上一个最优记录下来，下一次先把上一次路径的chosen清零
+        arcs = []
+        for node_id in range(1, len(node_passed) - 2):
+            node_name = node_passed[node_id]
+            next_node_name = node_passed[node_id + 1]
+            arcs.append(self.arcs[node_name[0], next_node_name[0]][node_name[1]][next_node_name[1] - node_name[1]].index)
+        return tuple(arcs)
+
+    def update_arc_chosen(self, arc_choice):
+        '''
+        通过获取的opt_path，将路径中包含的弧的 isChosen 属性更新，只改动与上一轮路径不同的弧
+        :param arc_choice: ArcChoice, chosen arcs and per-node usage of the LR solution
+        :return:
+        '''
+        new_arcs = self.path_arcs(self.opt_path_LR.node_passed)
+        if new_arcs == self.opt_arcs_LR:
+            return
+        new_set = set(new_arcs)
+        old_set = set(self.opt_arcs_LR)
+        for arc_index in self.opt_arcs_LR:  # 上一轮选了、这一轮没选的清零
+            if arc_index not in new_set:
+                arc_choice.remove(arc_index)
+        for arc_index in new_arcs:
+            if arc_index not in old_set:
+                arc_choice.add(arc_index)
+        self.opt_arcs_LR = new_arcs
 
     def truncate_train_time_bound(self, TimeSpan):
         right_bound_by_sink = [] # 从总天窗时间右端反推至该站的右侧边界，按运行最快了算
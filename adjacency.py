@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# 列车网络的轻量邻接表示（CSR），代替每列车一个 networkx 子图；需要调试/画图时再用 to_networkx 转换
+import numpy as np
+
+
+class TrainAdjacency():
+    def __init__(self, nodes, indptr, indices, weight, arc_ids, arcs=None, node_layer=None):
+        '''
+        :param nodes: local node id => (sta, t), layer by layer along v_staList and by t within a layer, i.e. a
+                      topological order
+        :param indptr: CSR, the out arcs of node i are indptr[i]:indptr[i + 1]
+        :param indices: head node of every arc
+        :param weight: arc length of every arc
+        :param arc_ids: arc index of every arc (store id in store mode, Arc.index otherwise, -1 if not numbered yet)
+        :param arcs: Arc objects in the same order, object mode only
+        :param node_layer: position of the station of every node in v_staList
+        '''
+        self.nodes = nodes
+        self.node_id = {node: i for i, node in enumerate(nodes)}
+        self.indptr = indptr
+        self.indices = indices
+        self.weight = weight
+        self.arc_ids = arc_ids
+        self.arcs = arcs
+        self.node_layer = node_layer
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def n_arcs(self):
+        return len(self.indices)
+
+    def successors(self, node):
+        '''
+        :param node: (sta, t)
+        :return: [(head node, arc length)]
+        '''
+        i = self.node_id[node]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return [(self.nodes[j], w) for j, w in zip(self.indices[lo:hi].tolist(), self.weight[lo:hi].tolist())]
+
+    def live_arcs(self):
+        '''
+        arcs on at least one source-sink path: tail reachable from the source (first node) and sink reachable
+        from the head (last node), by one forward and one backward pass layer by layer
+        :return: bool array over the arcs
+        '''
+        tails = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        heads = self.indices
+        forward = np.zeros(self.n_nodes, dtype=bool)
+        backward = np.zeros(self.n_nodes, dtype=bool)
+        if self.n_nodes > 0 and self.nodes[0][0] == 's_':
+            forward[0] = True
+        if self.n_nodes > 0 and self.nodes[-1][0] == '_t':
+            backward[-1] = True
+        # 弧按尾节点排序，也就按层排序；层 i 的弧只流向层 i + 1
+        arc_layer = self.node_layer[tails]
+        bounds = np.searchsorted(arc_layer, np.arange(int(arc_layer[-1]) + 2)).tolist() if len(tails) > 0 else [0]
+        layers = list(zip(bounds[:-1], bounds[1:]))
+        for lo, hi in layers:
+            tails_i, heads_i = tails[lo:hi], heads[lo:hi]
+            forward[heads_i[forward[tails_i]]] = True
+        for lo, hi in reversed(layers):
+            tails_i, heads_i = tails[lo:hi], heads[lo:hi]
+            backward[tails_i[backward[heads_i]]] = True
+        return forward[tails] & backward[heads]
+
+    def to_networkx(self, traNo=None):
+        '''
+        nx.DiGraph with the same nodes and weighted edges as the subgraph Train used to build
+        '''
+        import networkx as nx  # 只在调试时需要
+
+        graph = nx.DiGraph(traNo=traNo)
+        graph.add_nodes_from(self.nodes)
+        tails = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        graph.add_weighted_edges_from((self.nodes[u], self.nodes[v], w) for u, v, w in
+                                      zip(tails.tolist(), self.indices.tolist(), self.weight.tolist()))
+        return graph
+
+
+def build_adjacency(train):
+    '''
+    CSR adjacency of a train network from train.arcs (object mode) or straight from the store columns (store mode)
+    :param train: Train with its arcs created
+    :return: TrainAdjacency
+    '''
+    arcs = None
+    if train.arc_store is not None:
+        store = train.arc_store
+        lo, hi = store.train_ranges[train.store_id]
+        tail_layer = store.layer[lo:hi].astype(np.int64)
+        tail_t = store.tail_t[lo:hi].astype(np.int64)
+        head_t = store.head_t[lo:hi].astype(np.int64)
+        weight = store.arc_length[lo:hi].astype(np.int64)
+        arc_ids = np.arange(lo, hi, dtype=np.int64)
+    else:
+        layer_of = {sta: i for i, sta in enumerate(train.v_staList)}
+        arcs = [arc for arcs_sec in train.arcs.values() for arcs_t in arcs_sec.values() for arc in arcs_t.values()]
+        # 用 v_staList 中的站名（与 node_passed 一致）而非 arc.staBelong_pre，汇点弧的 staBelong_pre 是实际车站名
+        tail_layer = np.array([layer_of[dep] for (dep, arr), arcs_sec in train.arcs.items()
+                               for arcs_t in arcs_sec.values() for _ in arcs_t], dtype=np.int64)
+        tail_t = np.array([arc.timeBelong_pre for arc in arcs], dtype=np.int64)
+        head_t = np.array([arc.timeBelong_next for arc in arcs], dtype=np.int64)
+        weight = np.array([arc.arc_length for arc in arcs], dtype=np.int64)
+        arc_ids = np.array([-1 if arc.index is None else arc.index for arc in arcs], dtype=np.int64)
+    head_layer = tail_layer + 1
+
+    # 节点编码 layer * t_size + t + 1（源/汇节点 t = -1），排序后即按层的拓扑序
+    t_size = int(max(tail_t.max(), head_t.max())) + 2 if len(tail_t) > 0 else 1
+    tail_key = tail_layer * t_size + tail_t + 1
+    head_key = head_layer * t_size + head_t + 1
+    keys = np.unique(np.concatenate([tail_key, head_key]))
+    tails = np.searchsorted(keys, tail_key)
+    heads = np.searchsorted(keys, head_key)
+    order = np.argsort(tails, kind='stable')
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=len(keys)), out=indptr[1:])
+    nodes = [(train.v_staList[key // t_size], key % t_size - 1) for key in keys.tolist()]
+    if arcs is not None:
+        arcs = [arcs[i] for i in order.tolist()]
+    return TrainAdjacency(nodes, indptr, heads[order], weight[order], arc_ids[order], arcs, keys // t_size)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# LR子问题的批量求解：经过相同车站序列（v_staList）的列车分为一组，组内所有列车的DP放在一个
+# (列车 × 时刻) 的矩阵上逐层推进，每层只是几次数组运算；各列车的始发时间窗等差别体现在各自拥有的弧上。
+# 结果（含同费用时选哪条弧）与逐列车调用 dag_shortest_path 相同
+import numpy as np
+
+from profiling import profiler
+
+
+class _Group():
+    def __init__(self, v_staList, trains, time_span):
+        '''
+        layer by layer arc arrays of the trains of one group
+        :param v_staList: the common virtual station list
+        :param trains: trains of the group, row i of the DP matrix is trains[i]
+        :param time_span:
+        '''
+        self.v_staList = v_staList
+        self.width = time_span + 1  # 第0列为 t = -1（源/汇节点）
+        rows, layers, tails, heads, arc_ids = [], [], [], [], []
+        for row, train in enumerate(trains):
+            adj = train.adjacency()
+            node_t = np.array([t for _, t in adj.nodes], dtype=np.int64)
+            tail_nodes = np.repeat(np.arange(adj.n_nodes), np.diff(adj.indptr))
+            rows.append(np.full(adj.n_arcs, row, dtype=np.int64))
+            layers.append(adj.node_layer[tail_nodes])
+            tails.append(node_t[tail_nodes] + 1)
+            heads.append(node_t[adj.indices] + 1)
+            arc_ids.append(adj.arc_ids)
+        layers = np.concatenate(layers)
+        order = np.argsort(layers, kind='stable')  # 每层内各列车的弧保持 dag_shortest_path 的扩展顺序
+        self.rows = np.concatenate(rows)[order]
+        self.tails = np.concatenate(tails)[order]
+        self.heads = np.concatenate(heads)[order]
+        self.arc_ids = np.concatenate(arc_ids)[order]
+        self.bounds = np.searchsorted(layers[order], np.arange(len(v_staList))).tolist()
+        self.n_rows = len(trains)
+
+    def solve(self, arc_costs, org_t, des_t):
+        '''
+        :param arc_costs: cost array indexed by arc index
+        :return: list of (node_passed, cost), ordered as the rows
+        '''
+        dist = np.full((self.n_rows, self.width), np.inf)
+        dist[:, org_t + 1] = 0
+        preds = []  # 各层各节点的最优入弧在该组弧数组中的位置
+        for lo, hi in zip(self.bounds[:-1], self.bounds[1:]):
+            rows = self.rows[lo:hi]
+            cand = dist[rows, self.tails[lo:hi]] + arc_costs[self.arc_ids[lo:hi]]
+            key = rows * self.width + self.heads[lo:hi]
+            order = np.lexsort((cand, key))  # 同一头节点按费用排序，费用相同保持弧的顺序
+            key_sorted = key[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = key_sorted[1:] != key_sorted[:-1]
+            best = order[first]
+            best = best[np.isfinite(cand[best])]
+            dist = np.full((self.n_rows, self.width), np.inf)
+            dist.flat[key[best]] = cand[best]
+            pred = np.full(self.n_rows * self.width, -1, dtype=np.int64)
+            pred[key[best]] = lo + best
+            preds.append(pred)
+        profiler.count('arcs_relaxed', self.bounds[-1] - self.bounds[0])
+
+        # 沿最优入弧逐层回溯，所有列车一起
+        costs = dist[:, des_t + 1]
+        reached = np.isfinite(costs)
+        times = np.zeros((self.n_rows, len(self.v_staList)), dtype=np.int64)
+        times[:, -1] = des_t
+        col = np.full(self.n_rows, des_t + 1)
+        row_ids = np.arange(self.n_rows)
+        for layer in range(len(self.v_staList) - 1, 0, -1):
+            arc_pos = preds[layer - 1][row_ids * self.width + col]
+            arc_pos = np.where(reached, arc_pos, self.bounds[0])
+            col = self.tails[arc_pos]
+            times[:, layer - 1] = col - 1
+        solutions = []
+        for row in range(self.n_rows):
+            if not reached[row]:
+                solutions.append((None, float('inf')))
+                continue
+            solutions.append(([[sta, t] for sta, t in zip(self.v_staList, times[row].tolist())], float(costs[row])))
+        return solutions
+
+
+class BatchedPricing():
+    def __init__(self, train_list, incidence, org=('s_', -1), des=('_t', -1)):
+        '''
+        LR pricing of all trains by one vectorized DP per group of trains with the same v_staList;
+        trains sharing arcs with a template (Train.share_arcs) take its solution
+        :param train_list:
+        :param incidence: ArcNodeIncidence built on train_list
+        :param org: source node name [sta, t]
+        :param des: sink node name [sta, t]
+        '''
+        self.incidence = incidence
+        self.n_trains = len(train_list)
+        self.org = org
+        self.des = des
+        self.copy_of = list(range(self.n_trains))
+        train_id_of = {id(train): train_id for train_id, train in enumerate(train_list)}
+        members = {}
+        for train_id, train in enumerate(train_list):
+            template = getattr(train, 'template', None)
+            if template is not None and id(template) in train_id_of:
+                self.copy_of[train_id] = train_id_of[id(template)]
+                continue
+            members.setdefault(tuple(train.v_staList), []).append(train_id)
+        self.groups = [(ids, _Group(list(v_staList), [train_list[i] for i in ids], incidence.time_span))
+                       for v_staList, ids in members.items()]
+
+    def solve(self, multiplier):
+        '''
+        :param multiplier: multiplier array, shape (stations, time_span)
+        :return: list of (node_passed, cost), ordered as train_list
+        '''
+        arc_costs = self.incidence.reduced_costs(multiplier)
+        solutions = [None] * self.n_trains
+        for ids, group in self.groups:
+            for train_id, solution in zip(ids, group.solve(arc_costs, self.org[1], self.des[1])):
+                solutions[train_id] = solution
+        return [solutions[template] for template in self.copy_of]
+
+    def shutdown(self):
+        pass
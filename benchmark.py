@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# LR 排图流程的基准测试：按 data/*.csv 的格式生成可复现的算例，分阶段计时，结果写成 JSON 便于跨版本比较
+# usage: python benchmark.py --stations 30 --trains 10 --time-span 500 --iterations 20 --output bench.json
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+import main
+from incidence import ArcNodeIncidence, ArcChoice, NodeOccupation
+from profiling import profiler
+from termination import Termination
+
+
+def generate_instance(data_dir, n_stations, n_trains, stop_ratio=0.3, seed=0):
+    '''
+    write station.csv, section.csv and train.csv in the schema read by main.read_station/read_section/read_train
+    :param data_dir:
+    :param n_stations:
+    :param n_trains:
+    :param stop_ratio: probability that a train stops at an intermediate station
+    :param seed:
+    :return: paths of the three files
+    '''
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    stations = ['S' + str(i) for i in range(n_stations)]
+    miles = [0]
+    for i in range(1, n_stations):
+        miles.append(miles[-1] + rng.randint(20, 60))
+
+    station_path = os.path.join(data_dir, 'station.csv')
+    with open(station_path, 'w') as f:
+        f.write('station,mile\n')
+        for sta, mile in zip(stations, miles):
+            f.write(sta + ',' + str(mile) + '\n')
+
+    section_path = os.path.join(data_dir, 'section.csv')
+    with open(section_path, 'w') as f:
+        f.write('section,time\n')
+        for i in range(n_stations - 1):
+            run_time = max(3, round((miles[i + 1] - miles[i]) / 5))  # 约 300km/h
+            f.write(stations[i] + '-' + stations[i + 1] + ',' + str(run_time) + '\n')
+
+    train_path = os.path.join(data_dir, 'train.csv')
+    with open(train_path, 'w') as f:
+        f.write('train,speed,' + ','.join(stations) + '\n')
+        for k in range(n_trains):
+            stops = ['1' if i == 0 or i == n_stations - 1 or rng.random() < stop_ratio else '0'
+                     for i in range(n_stations)]
+            f.write('G' + str(k) + ',' + rng.choice(['300', '350']) + ',' + ','.join(stops) + '\n')
+    return station_path, section_path, train_path
+
+
+def reset_main(time_span):
+    '''
+    clear the module level state of main.py so that several instances can be run in one process
+    '''
+    for container in (main.staList, main.v_staList, main.secTimes, main.miles, main.trainList, main.nodeList):
+        container.clear()
+    main.TimeSpan = time_span
+
+
+class PhaseTimer():
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.record[self.name] = self.record.get(self.name, 0) + time.perf_counter() - self.start
+
+
+def run_benchmark(data_dir, time_span, iterations):
+    '''
+    run the main.py pipeline on an instance for a fixed number of LR iterations (main.lagrangian_relaxation),
+    timing each phase
+    :return: dict of phase timings and per-iteration timings
+    '''
+    reset_main(time_span)
+    phases = {}
+    with PhaseTimer(phases, 'read_station'):
+        main.read_station(os.path.join(data_dir, 'station.csv'))
+    with PhaseTimer(phases, 'read_section'):
+        main.read_section(os.path.join(data_dir, 'section.csv'))
+    with PhaseTimer(phases, 'read_train'):
+        main.read_train(os.path.join(data_dir, 'train.csv'))
+    with PhaseTimer(phases, 'init_nodes'):
+        main.init_nodes()
+    with PhaseTimer(phases, 'add_arcs_to_nodes_by_flow'):
+        main.add_arcs_to_nodes_by_flow()
+    with PhaseTimer(phases, 'build_incidence'):  # 弧的节点占用（含间隔）在这里按区间建立
+        main.incidence = ArcNodeIncidence(main.v_staList[1:-1], time_span).build(main.trainList)
+        main.multiplier = np.zeros((len(main.v_staList) - 2, time_span))
+        main.arc_choice = ArcChoice(main.incidence)
+        main.occupation = NodeOccupation(main.incidence)
+
+    # main.py 的 LR 循环本身，各轮各阶段的时间由 profiler 记录；gap 目标为0，跑满固定轮数（除非间隙闭合）
+    profiler.events.clear()
+    profiler.enable(trace_memory=False)
+    try:
+        LB, UB, gap = main.lagrangian_relaxation(interval=iterations + 1, termination=Termination(0.0, iterations))
+    finally:
+        profiler.disable()
+    records = [{} for _ in LB]
+    for event in profiler.events:
+        iter = event['args'].get('iteration')
+        if iter is not None:
+            records[iter][event['name']] = records[iter].get(event['name'], 0) + event['duration']
+    for record, lb, ub in zip(records, LB, UB):
+        record['LB'] = float(lb)
+        record['UB'] = float(ub)
+
+    summary = {}
+    for name in ('lr_subproblems', 'feasibility_repair', 'multiplier_update'):
+        summary[name] = sum(record.get(name, 0) for record in records)
+    return {
+        'phases': phases,
+        'iterations': records,
+        'iteration_totals': summary,
+        'n_arcs': len(main.incidence.arcs),
+        'n_occupations': main.incidence.n_occupations,
+        'total': sum(phases.values()) + sum(summary.values()),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark of the LR timetabling pipeline on a synthetic instance')
+    parser.add_argument('--stations', type=int, default=30)
+    parser.add_argument('--trains', type=int, default=10)
+    parser.add_argument('--time-span', type=int, default=500)
+    parser.add_argument('--stop-ratio', type=float, default=0.3)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=None, help='where to write the instance, a temporary dir by default')
+    parser.add_argument('--output', default='bench_output.json')
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='ttp_bench_')
+    generate_instance(data_dir, args.stations, args.trains, args.stop_ratio, args.seed)
+    result = {
+        'instance': {'stations': args.stations, 'trains': args.trains, 'time_span': args.time_span,
+                     'stop_ratio': args.stop_ratio, 'seed': args.seed, 'iterations': args.iterations},
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+    result.update(run_benchmark(data_dir, args.time_span, args.iterations))
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps({'phases': result['phases'], 'iteration_totals': result['iteration_totals'],
+                      'total': result['total']}, indent=2))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+# 弧-节点关联：每条弧在出发站（弧尾）和到达站（弧头）各占用一段连续时刻 [t - before, t + after]，
+# 节点编号 sta_index * time_span + t 下即一段连续编号，按区间 [occ_lo, occ_hi) 存储，内存 O(弧数)；
+# 每轮LR的弧费用（弧长 + 占用节点乘子之和）为乘子前缀和之差，选中弧对各节点的占用次数用差分数组维护
+import numpy as np
+
+
+def interval_sums(values, occ_lo, occ_hi):
+    '''
+    sum of values over the occupation intervals of every arc, by prefix sums
+    :param values: vector ordered by node index
+    :param occ_lo: (arcs, 2) interval starts
+    :param occ_hi: (arcs, 2) interval ends, exclusive
+    :return: vector ordered by arc
+    '''
+    prefix = np.zeros(len(values) + 1)
+    np.cumsum(values, out=prefix[1:])
+    return (prefix[occ_hi] - prefix[occ_lo]).sum(axis=1)
+
+
+class ArcNodeIncidence():
+    def __init__(self, stations, time_span):
+        '''
+        :param stations: virtual stations with multipliers (v_staList without source/sink)
+        :param time_span:
+        '''
+        self.stations = list(stations)
+        self.time_span = time_span
+        self.sta_index = {sta: i for i, sta in enumerate(self.stations)}
+        self.n_nodes = len(self.stations) * time_span  # 节点编号: sta_index * time_span + t，与 (stations, time_span) 的乘子数组展平后一致
+        self.arcs = []  # 以arc index为下标
+        self.arc_length = None
+        self.occ_lo = None  # 弧i在出发站(第0列)/到达站(第1列)占用的节点为 occ_lo[i, j]:occ_hi[i, j]，不占用时为空区间
+        self.occ_hi = None
+        self._csr = None  # 按需展开的 (indptr, indices)
+
+    def node_index(self, sta, t):
+        return self.sta_index[sta] * self.time_span + t
+
+    def _occupation(self, sides):
+        '''
+        occupation intervals from per-side columns; a side occupies nodes only when its station has multipliers and
+        its own time is inside the time span, the interval is clipped to the time span
+        :param sides: for side 0 (departure, arc tail) and 1 (arrival, arc head): (station row or -1, t, before, after)
+        :return:
+        '''
+        n_arcs = len(sides[0][0])
+        self.occ_lo = np.zeros((n_arcs, 2), dtype=np.int64)
+        self.occ_hi = np.zeros((n_arcs, 2), dtype=np.int64)
+        for side, (sta_row, t, before, after) in enumerate(sides):
+            occupying = (sta_row >= 0) & (t >= 0) & (t < self.time_span)
+            base = sta_row * self.time_span
+            self.occ_lo[:, side] = np.where(occupying, base + np.maximum(t - before, 0), 0)
+            self.occ_hi[:, side] = np.where(occupying, base + np.minimum(t + after, self.time_span - 1) + 1, 0)
+        self._csr = None
+
+    def build(self, train_list):
+        '''
+        number every train arc and collect its occupation intervals (the headway before/after the departure and
+        arrival, taken from the arc attributes)
+        :param train_list:
+        :return:
+        '''
+        arc_length = []
+        sides = ([], [], [], []), ([], [], [], [])
+        for train in train_list:
+            if train.template is not None:  # 共用弧，不重复编号
+                continue
+            arc_lo = len(self.arcs)
+            for arcs_sec in train.arcs.values():  # dep-arr => t => span
+                for arcs_t in arcs_sec.values():
+                    for arc in arcs_t.values():
+                        arc.index = len(self.arcs)
+                        self.arcs.append(arc)
+                        arc_length.append(arc.arc_length)
+                        # 出发站(sta_)按弧尾占用，到达站(_sta)按弧头占用，s_/_t 没有乘子
+                        for (rows, ts, befores, afters), sta, t, before, after, is_side in (
+                                (sides[0], arc.staBelong_pre, arc.timeBelong_pre, arc.before_occupy_dep,
+                                 arc.after_occupy_dep, str.endswith),
+                                (sides[1], arc.staBelong_next, arc.timeBelong_next, arc.before_occupy_arr,
+                                 arc.after_occupy_arr, str.startswith)):
+                            rows.append(self.sta_index[sta] if sta in self.sta_index and is_side(sta, '_') else -1)
+                            ts.append(t)
+                            befores.append(before)
+                            afters.append(after)
+            train.arc_range = (arc_lo, len(self.arcs))  # 每列车的弧连续编号
+        for train in train_list:
+            if train.template is not None:
+                train.arc_range = train.template.arc_range
+        self.arc_length = np.array(arc_length, dtype=float)
+        self._occupation([tuple(np.array(column, dtype=np.int64) for column in side) for side in sides])
+        return self
+
+    def build_from_store(self, store):
+        '''
+        same structure straight from a frozen ArcStore (arc index = store id), no Node object involved
+        :param store: ArcStore
+        :return:
+        '''
+        self.arcs = store
+        sta_row = np.array([self.sta_index.get(sta, -1) for sta in store.station_names], dtype=np.int64)
+        # 出发站(sta_)按弧尾占用，到达站(_sta)按弧头占用，s_/_t 没有乘子
+        is_dep = np.array([sta.endswith('_') for sta in store.station_names], dtype=bool)
+        is_arr = np.array([sta.startswith('_') for sta in store.station_names], dtype=bool)
+        self.arc_length = store.arc_length.astype(float)
+        self._occupation(((np.where(is_dep, sta_row, -1)[store.tail_sta], store.tail_t.astype(np.int64),
+                           store.before_occupy_dep.astype(np.int64), store.after_occupy_dep.astype(np.int64)),
+                          (np.where(is_arr, sta_row, -1)[store.head_sta],
+                           store.tail_t.astype(np.int64) + store.span,
+                           store.before_occupy_arr.astype(np.int64), store.after_occupy_arr.astype(np.int64))))
+        return self
+
+    def load(self, arcs, arc_length, occ_lo, occ_hi):
+        '''
+        restore the occupation from arrays saved earlier (see network_cache)
+        :param arcs: arc list or ArcStore, ordered by arc index
+        :return:
+        '''
+        self.arcs = arcs
+        self.arc_length = np.asarray(arc_length, dtype=float)
+        self.occ_lo = np.asarray(occ_lo, dtype=np.int64)
+        self.occ_hi = np.asarray(occ_hi, dtype=np.int64)
+        self._csr = None
+        return self
+
+    @property
+    def n_occupations(self):
+        return int((self.occ_hi - self.occ_lo).sum())
+
+    def csr(self):
+        '''
+        the occupation as explicit CSR arrays (indices of arc i are indices[indptr[i]:indptr[i + 1]]),
+        expanded on first use
+        :return: indptr, indices
+        '''
+        if self._csr is None:
+            lengths = (self.occ_hi - self.occ_lo).ravel()
+            indptr = np.zeros(len(self.occ_lo) + 1, dtype=np.int64)
+            np.cumsum(lengths.reshape(-1, 2).sum(axis=1), out=indptr[1:])
+            starts = np.cumsum(lengths) - lengths
+            indices = np.repeat(self.occ_lo.ravel(), lengths) + np.arange(int(lengths.sum())) \
+                - np.repeat(starts, lengths)
+            self._csr = (indptr, indices)
+        return self._csr
+
+    def head_nodes(self):
+        '''
+        node index of the head of every arc, n_nodes for heads without a node here (sink)
+        :return: vector ordered by arc index
+        '''
+        if isinstance(self.arcs, list):
+            return np.array([self.node_index(arc.staBelong_next, arc.timeBelong_next)
+                             if arc.staBelong_next in self.sta_index and 0 <= arc.timeBelong_next < self.time_span
+                             else self.n_nodes for arc in self.arcs], dtype=np.int64)
+        store = self.arcs
+        sta_row = np.array([self.sta_index.get(sta, -1) for sta in store.station_names], dtype=np.int64)[store.head_sta]
+        head_t = store.head_t.astype(np.int64)
+        inside = (sta_row >= 0) & (head_t >= 0) & (head_t < self.time_span)
+        return np.where(inside, sta_row * self.time_span + head_t, self.n_nodes)
+
+    def occupied_nodes(self, arc_index):
+        '''
+        nodes occupied by an arc
+        :return: list of (sta, t)
+        '''
+        return [(self.stations[i // self.time_span], i % self.time_span)
+                for lo, hi in zip(self.occ_lo[arc_index].tolist(), self.occ_hi[arc_index].tolist())
+                for i in range(lo, hi)]
+
+    def arcs_on_nodes(self, node_mask):
+        '''
+        arcs occupying at least one of the given nodes
+        :param node_mask: bool vector ordered by node index
+        :return: bool vector ordered by arc index
+        '''
+        return self.count_on_nodes(node_mask) > 0
+
+    def count_on_nodes(self, node_mask):
+        '''
+        number of the given nodes occupied by every arc
+        :param node_mask: bool vector ordered by node index
+        :return: vector ordered by arc index
+        '''
+        return interval_sums(node_mask.astype(float), self.occ_lo, self.occ_hi)
+
+    def reduced_costs(self, multiplier):
+        '''
+        arc_length + sum of multipliers of the occupied nodes, for all arcs at once
+        :param multiplier: multipliers, array of shape (stations, time_span) or its flat view
+        :return: vector ordered by arc index
+        '''
+        return self.arc_length + interval_sums(multiplier.ravel(), self.occ_lo, self.occ_hi)
+
+
+class ArcChoice():
+    '''
+    arcs chosen by the LR solution and the number of chosen arcs occupying each node, kept as a difference array
+    over node index (+1 at the start, -1 after the end of every occupation interval), updated arc by arc as train
+    paths change, so the subgradient is one prefix sum
+    '''
+    def __init__(self, incidence):
+        self.incidence = incidence
+        self.chosen = np.zeros(len(incidence.arcs))  # 以arc.index为下标，选中该弧的列车数（共用弧的列车可能选同一条）
+        self.delta = np.zeros(incidence.n_nodes + 1)  # 各节点被选中弧占用次数的差分
+
+    def _shift(self, arc_index, step):
+        np.add.at(self.delta, self.incidence.occ_lo[arc_index], step)
+        np.add.at(self.delta, self.incidence.occ_hi[arc_index], -step)
+
+    def add(self, arc_index):
+        self.chosen[arc_index] += 1
+        self.incidence.arcs[arc_index].isChosen_LR = 1
+        self._shift(arc_index, 1)
+
+    def remove(self, arc_index):
+        self.chosen[arc_index] -= 1
+        self.incidence.arcs[arc_index].isChosen_LR = int(self.chosen[arc_index] > 0)
+        self._shift(arc_index, -1)
+
+    @property
+    def usage(self):
+        '''
+        number of chosen arcs occupying each node, vector ordered by node index
+        '''
+        return np.cumsum(self.delta[:-1])
+
+    def subgradient(self):
+        '''
+        usage - capacity of every node, shape (stations, time_span)
+        '''
+        return self.usage.reshape(len(self.incidence.stations), self.incidence.time_span) - 1  # 1为node capacity
+
+
+class NodeOccupation():
+    '''
+    nodes taken by the feasible solution so far, one bool per node index (plus an always free slot for the sink):
+    marking a path is one slice assignment per occupation interval, clearing is one fill, and the forbidden check
+    of a train is a gather over the heads of its arcs
+    '''
+    def __init__(self, incidence):
+        self.incidence = incidence
+        self.occupied = np.zeros(incidence.n_nodes + 1, dtype=bool)
+        self.head_node = incidence.head_nodes()
+
+    def occupy_arcs(self, arc_indices):
+        '''
+        mark the nodes occupied by the given arcs (headway included)
+        '''
+        occ_lo = self.incidence.occ_lo
+        occ_hi = self.incidence.occ_hi
+        for i in arc_indices:
+            for lo, hi in zip(occ_lo[i].tolist(), occ_hi[i].tolist()):
+                self.occupied[lo:hi] = True
+
+    def occupy_nodes(self, node_indices):
+        self.occupied[node_indices] = True
+
+    def clear(self):
+        self.occupied[:] = False
+
+    def blocked(self, lo, hi):
+        '''
+        whether the head node of arcs lo..hi-1 is occupied
+        :return: bool vector, position i for arc lo + i
+        '''
+        return self.occupied[self.head_node[lo:hi]]
+
+    def is_free(self, node_indices):
+        return not self.occupied[node_indices].any()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# 带资源约束的最短路（SPPRC）标号算法：每个节点一个标号桶，标号为 (费用, 各资源值, 父标号, 节点)，
+# 按 train.adjacency() 的节点顺序（拓扑序）扩展；新标号被桶内某个标号支配（费用和各资源都不更大）时丢弃，
+# 否则删去被它支配的标号。没有资源时每个节点只剩一个标号，结果与 dag_shortest_path 相同
+import math
+
+from profiling import profiler
+
+
+class Resource():
+    '''
+    side resource of a label, non-decreasing along a path, so a smaller value dominates a larger one.
+    Every unit used is added to the path cost times weight, a path using more than limit is dropped
+    '''
+    def __init__(self, limit=None, weight=0):
+        self.limit = limit
+        self.weight = weight
+
+    def __repr__(self):
+        return f"{type(self).__name__}(limit={self.limit}, weight={self.weight})"
+
+    def consumption(self, tail, head):
+        '''
+        :param tail: tail node (sta, t) of an arc
+        :param head: head node (sta, t) of the arc
+        :return: resource used on the arc
+        '''
+        raise NotImplementedError
+
+    def extend(self, value, tail, head):
+        '''
+        :return: value after the arc, None if the limit is exceeded
+        '''
+        value += self.consumption(tail, head)
+        if self.limit is not None and value > self.limit:
+            return None
+        return value
+
+
+def is_dwell_arc(tail, head):
+    # 停站弧: _sta => sta_
+    return tail[0].startswith('_') and head[0].endswith('_')
+
+
+class DwellTime(Resource):
+    '''
+    total dwell time over all stations
+    '''
+    def consumption(self, tail, head):
+        return head[1] - tail[1] if is_dwell_arc(tail, head) else 0
+
+
+class DepartureDeviation(Resource):
+    '''
+    |departure - preferred_time|, taken on the source arc
+    '''
+    def __init__(self, preferred_time, limit=None, weight=0):
+        super().__init__(limit, weight)
+        self.preferred_time = preferred_time
+
+    def consumption(self, tail, head):
+        if tail[0] != 's_':
+            return 0
+        return abs(head[1] - self.preferred_time)
+
+
+def train_resources(train, max_dwell=None, max_deviation=None, deviation_weight=0):
+    '''
+    resources of a train from the usual limits, a resource is left out when it has neither limit nor weight
+    (no stop count: the line plan fixes the stops, every stop dwells at least min_dwellTime and every pass 0,
+    so all paths of a train have the same stops)
+    :param max_dwell: total dwell time limit
+    :param max_deviation: limit on the departure deviation from train.preferred_time
+    :param deviation_weight: cost per time step of departure deviation
+    :return: list of Resource
+    '''
+    resources = []
+    if max_dwell is not None:
+        resources.append(DwellTime(max_dwell))
+    preferred_time = getattr(train, 'preferred_time', None)
+    try:
+        preferred_time = float(preferred_time)
+    except (TypeError, ValueError):
+        preferred_time = math.nan
+    if (max_deviation is not None or deviation_weight) and not math.isnan(preferred_time):
+        resources.append(DepartureDeviation(preferred_time / train.time_scale, max_deviation, deviation_weight))
+    return resources
+
+
+def resource_cost(node_passed, resources):
+    '''
+    weighted resource usage of a path, the part of the labelling cost that is not an arc cost
+    :param node_passed: node names [sta, t] from source to sink
+    :param resources: Resource list
+    :return:
+    '''
+    cost = 0
+    for resource in resources:
+        if resource.weight:
+            cost += resource.weight * sum(resource.consumption(tail, head)
+                                          for tail, head in zip(node_passed[:-1], node_passed[1:]))
+    return cost
+
+
+def _dominates(cost, res, other):
+    return cost <= other[0] and all(a <= b for a, b in zip(res, other[1]))
+
+
+def resource_constrained_shortest_path(org, des, train, arc_costs=None, resources=None, occupation=None):
+    '''
+    labelling algorithm with Pareto dominance on (cost, resources)
+    :param org: source node name [sta, t]
+    :param des: sink node name [sta, t]
+    :param train: train with its arcs numbered (see ArcNodeIncidence)
+    :param arc_costs: flat cost array indexed by arc index, arc lengths if None
+    :param resources: Resource list, train.resources by default
+    :param occupation: NodeOccupation, arcs into occupied nodes are skipped (feasible solution phase)
+    :return: node_passed (list of node names [sta, t] from source to sink), cost; (None, inf) if no path satisfies
+             the resource limits
+    '''
+    resources = train.resources if resources is None else resources
+    adj = train.adjacency()
+    source = adj.node_id.get(tuple(org))
+    sink = adj.node_id.get(tuple(des))
+    if source is None or sink is None:
+        return None, float('inf')
+    arc_ids = adj.arc_ids.tolist()
+    costs = adj.weight.tolist() if arc_costs is None else [arc_costs[i] for i in arc_ids]
+    blocked = None
+    if occupation is not None:
+        lo, hi = train.arc_store.train_ranges[train.store_id] if train.arc_store is not None else train.arc_range
+        blocked = occupation.blocked(lo, hi)[adj.arc_ids - lo].tolist()
+    indptr = adj.indptr.tolist()
+    indices = adj.indices.tolist()
+    nodes = adj.nodes
+
+    buckets = [[] for _ in range(adj.n_nodes)]
+    buckets[source].append((0, (0,) * len(resources), None, source))
+    n_relaxed = 0
+    n_labels = 0
+    n_dominated = 0
+    for u in range(source, sink):
+        if not buckets[u]:
+            continue
+        tail = nodes[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            if blocked is not None and blocked[e]:  # 若下一节点已经被占用
+                continue
+            v = indices[e]
+            head = nodes[v]
+            bucket = buckets[v]
+            for label in buckets[u]:
+                n_relaxed += 1
+                cost = label[0] + costs[e]
+                res = []
+                for resource, value in zip(resources, label[1]):
+                    new_value = resource.extend(value, tail, head)
+                    if new_value is None:  # 超出资源上限
+                        break
+                    cost += resource.weight * (new_value - value)
+                    res.append(new_value)
+                else:
+                    res = tuple(res)
+                    if any(_dominates(other[0], other[1], (cost, res)) for other in bucket):
+                        n_dominated += 1
+                        continue
+                    kept = [other for other in bucket if not _dominates(cost, res, other)]
+                    n_dominated += len(bucket) - len(kept)
+                    kept.append((cost, res, label, v))
+                    buckets[v] = bucket = kept
+                    n_labels += 1
+        buckets[u] = None  # 拓扑序之后不会再用到
+    profiler.count('arcs_relaxed', n_relaxed)
+    profiler.count('labels_generated', n_labels)
+    profiler.count('labels_dominated', n_dominated)
+
+    if not buckets[sink]:
+        return None, float('inf')
+    best = min(buckets[sink], key=lambda label: label[0])
+    node_passed = []
+    label = best
+    while label is not None:  # 沿父标号回溯路径
+        node_passed.append(list(nodes[label[3]]))
+        label = label[2]
+    node_passed.reverse()
+    return node_passed, best[0]
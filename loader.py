@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# 输入数据的列式读取：Excel 只在第一次（或源文件更新后）转成 Parquet/CSV，之后直接读列式文件，
+# 开行方案按 列车 × 车站 的停站矩阵整体处理，不再逐行解析
+import os
+
+import numpy as np
+import pandas as pd
+
+try:  # Parquet 需要 pyarrow，没有时退回 CSV
+    import pyarrow  # noqa: F401
+    COLUMNAR_SUFFIX = '.parquet'
+except ImportError:
+    COLUMNAR_SUFFIX = '.csv'
+
+EXCEL_SUFFIXES = ('.xlsx', '.xls')
+
+
+def columnar_copy(path, out_dir=None):
+    '''
+    convert an Excel sheet to a columnar file next to it (or in out_dir), reused while it is newer than the source
+    :param path: .xlsx/.xls file
+    :param out_dir:
+    :return: path of the columnar file
+    '''
+    stem = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(out_dir or os.path.dirname(path), stem + COLUMNAR_SUFFIX)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return target
+    df = pd.read_excel(path, dtype=str)  # 全部按字符串转存，类型在读入时再定，避免车次等被转成数字
+    df.columns = [str(col) for col in df.columns]
+    if COLUMNAR_SUFFIX == '.parquet':
+        df.to_parquet(target, index=False)
+    else:
+        df.to_csv(target, index=False)
+    return target
+
+
+def read_table(path, dtype=None):
+    '''
+    read a table from Excel, Parquet or CSV; column names are always str
+    :param path:
+    :param dtype: passed to pandas, e.g. str for all columns or {column: str}
+    :return: DataFrame
+    '''
+    if path.endswith(EXCEL_SUFFIXES):
+        path = columnar_copy(path)
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        df.columns = [str(col) for col in df.columns]
+        # Parquet 中按字符串存储，转回数值列
+        for col in df.columns:
+            if dtype is str or (isinstance(dtype, dict) and col in dtype):
+                continue
+            converted = pd.to_numeric(df[col], errors='coerce')
+            if converted.notna().sum() == df[col].notna().sum():
+                df[col] = converted
+        if isinstance(dtype, dict):
+            df = df.astype(dtype)
+    else:
+        df = pd.read_csv(path, dtype=dtype)
+        df.columns = [str(col) for col in df.columns]
+    return df
+
+
+def stop_matrix(df, stations, stop_value=None):
+    '''
+    stop flags of all trains at once
+    :param df: line plan table, one row per train, one column per station
+    :param stations: station columns in order
+    :param stop_value: if given, a station is a stop when the cell equals it, otherwise negative values count as 0
+    :return: int array (trains, stations)
+    '''
+    cells = df[list(stations)]
+    if stop_value is not None:
+        return (cells == stop_value).to_numpy(dtype=np.int64)
+    return cells.fillna(0).clip(lower=0).to_numpy(dtype=np.int64)
+
+
+def line_plans(matrix, stations):
+    '''
+    linePlan dict (station => stop flag) of every train from a stop matrix
+    '''
+    stations = list(stations)
+    return [dict(zip(stations, row)) for row in matrix.tolist()]
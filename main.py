@@ -1,8 +1,11 @@
-import collections
-import re
 from Train import *
 from Node import *
-import copy
+from shortest_path import dag_shortest_path
+from incidence import ArcNodeIncidence, ArcChoice, NodeOccupation
+from multiplier_update import make_strategy
+from profiling import profiler
+from termination import Termination
+import loader
 import matplotlib.pyplot as plt
 import numpy as np
 import time
@@ -21,18 +24,9 @@ start_time = time.time()
 
 
 def read_station(path):
-    f = open(path, 'r')
-    lines = f.readlines()
-    count = 0
-    for line in lines:
-        if count == 0:
-            count += 1
-            continue
-        
-        line = line[:-1]
-        str = re.split(r",", line)
-        staList.append(str[0])
-        miles.append(int(str[1]))
+    df = loader.read_table(path)
+    staList.extend(df.iloc[:, 0].astype(str).tolist())
+    miles.extend(df.iloc[:, 1].astype(int).tolist())
     v_staList.append('_s')
     for sta in staList:
         if staList.index(sta) != 0:  # 不为首站，有到达
@@ -43,36 +37,20 @@ def read_station(path):
 
 
 def read_section(path):
-    f = open(path, 'r')
-    lines = f.readlines()
-    count = 0
-    for line in lines:
-        if count == 0:
-            count += 1
-            continue
-        line = line[:-1]
-        str = re.split(r",", line)
-        pair = re.split(r"-", str[0])
-        secTimes[pair[0], pair[1]] = int(str[1])
+    df = loader.read_table(path)
+    pairs = df.iloc[:, 0].astype(str).str.split('-', expand=True)
+    secTimes.update(zip(zip(pairs[0].tolist(), pairs[1].tolist()), df.iloc[:, 1].astype(int).tolist()))
 
 
 def read_train(path):
-    f = open(path, 'r')
-    lines = f.readlines()
-    count = 0
-    for line in lines:
-        if count == 0:
-            count += 1
-            continue
-        line = line[:-1]
-        str = re.split(r",", line)
-        train = Train(str[0], 0, TimeSpan)
-        train.speed = str[1]
-        for i in range(0, len(staList)):
-            if (str[i + 2] == '1'):
-                train.linePlan[staList[i]] = 1
-            else:
-                train.linePlan[staList[i]] = 0
+    df = loader.read_table(path, dtype=str)
+    # 第3列起依次为 staList 中各站的停站标记
+    stops = loader.stop_matrix(df, df.columns[2:2 + len(staList)], stop_value='1')
+    for traNo, speed, linePlan in zip(df.iloc[:, 0].tolist(), df.iloc[:, 1].tolist(),
+                                      loader.line_plans(stops, staList)):
+        train = Train(traNo, 0, TimeSpan)
+        train.speed = speed
+        train.linePlan = linePlan
         train.init_traStaList(staList)
         train.create_arcs_LR(secTimes, TimeSpan)
         trainList.append(train)
@@ -97,66 +75,26 @@ def init_nodes():
 
 
 def add_arcs_to_nodes_by_flow():
-    # associate node with train arcs, add incoming and outgoing arcs to nodes
-    for nodes_sta in nodeList.values():
-        for node in nodes_sta.values():
-            for train in trainList:
-                node.associate_with_outgoing_arcs(train)
-                node.associate_with_incoming_arcs(train)
-
-
-# 通过列车弧的资源占用特性，将arc与node的关系建立
-def associate_arcs_nodes_by_resource_occupation():
-    for sta in v_staList:
-        if sta != v_staList[0] and sta.endswith('_'):  # all section departure stations
-            for t in range(0, TimeSpan):
-                # 先用车站做key，再用t做key索引到node
-                cur_node = nodeList[sta][t]
-                
-                if len(cur_node.out_arcs) == 0:  # 没有弧
-                    continue
-                
-                for tra in cur_node.out_arcs.keys():  # 先索引包含的列车
-                    for out_arc in cur_node.out_arcs[tra].values():  # 遍历这个列车在这个点的所有弧
-                        before_occupy = out_arc.before_occupy_dep
-                        after_occupy = out_arc.after_occupy_dep
-                        for i in range(0, before_occupy + 1):  # 前面节点占用，在这里把自己加上，可以取到0
-                            if t - i >= 0:
-                                nodeList[sta][t - i].incompatible_arcs.append(out_arc)
-                                out_arc.node_occupied.append(nodeList[sta][t - i])
-                            else:
-                                break
-                        for i in range(1, after_occupy + 1):  # 后面节点占用，这里就不取0了
-                            if t + i < TimeSpan:
-                                nodeList[sta][t + i].incompatible_arcs.append(out_arc)
-                                out_arc.node_occupied.append(nodeList[sta][t + i])
-                            else:
-                                break
-        
-        elif sta != v_staList[-1] and sta.startswith('_'):  # all section arrival stations
-            for t in range(0, TimeSpan):
-                # 先用车站做key，再用t做key索引到node
-                cur_node = nodeList[sta][t]
-                
-                if len(cur_node.in_arcs) == 0:  # 没有弧
-                    continue
-                
-                for tra in cur_node.in_arcs.keys():  # 先索引包含的列车
-                    for in_arc in cur_node.in_arcs[tra].values():  # 遍历这个列车在这个点的所有弧
-                        before_occupy = in_arc.before_occupy_arr
-                        after_occupy = in_arc.after_occupy_arr
-                        for i in range(0, before_occupy + 1):  # 前面节点占用
-                            if t - i >= 0:
-                                nodeList[sta][t - i].incompatible_arcs.append(in_arc)
-                                in_arc.node_occupied.append(nodeList[sta][t - i])
-                            else:
-                                break
-                        for i in range(1, after_occupy + 1):  # 后面节点占用
-                            if t + i < TimeSpan:
-                                nodeList[sta][t + i].incompatible_arcs.append(in_arc)
-                                in_arc.node_occupied.append(nodeList[sta][t + i])
-                            else:
-                                break
+    '''
+    associate node with train arcs, add incoming and outgoing arcs to nodes
+    one pass over each train's arcs, every arc is pushed into its tail and head nodes directly
+    '''
+    for train in trainList:
+        # train arc structure: key：[dep, arr], value为弧集字典(key: [t], value: arc字典, key为arc_length)
+        for (dep, arr), cur_arcs in train.arcs.items():
+            for start_t, arcs_from_start_t in cur_arcs.items():
+                tail_node = nodeList[dep].get(start_t)
+                if tail_node is not None:  # 流出弧
+                    tail_node.out_arcs[train.traNo] = {}
+                for arc_length, arc in arcs_from_start_t.items():
+                    train.add_subgraph_edge(arc)
+                    if tail_node is not None:
+                        tail_node.out_arcs[train.traNo][arc_length] = arc
+                    head_node = nodeList[arr].get(start_t + arc_length)  # 弧的头节点时刻为 start_t + span
+                    if head_node is not None:  # 流入弧
+                        if train.traNo not in head_node.in_arcs.keys():
+                            head_node.in_arcs[train.traNo] = {}
+                        head_node.in_arcs[train.traNo][arc_length] = arc
 
 
 # def get_train_timetable_from_result():
@@ -172,10 +110,21 @@ def associate_arcs_nodes_by_resource_occupation():
 #                         train.timetable[curSta] = t
 #                         train.timetable[nextSta] = t + arc_length
 def get_train_timetable_from_result():
+    '''
+    timetable of every train from its feasible path, trains left without one are reported and skipped
+    :return: traNo of the trains without a feasible path
+    '''
+    unscheduled = []
     for train in trainList:
         print("===============Tra_" + train.traNo + "======================")
+        train.timetable = {}
+        if train.feasible_path is None or train.feasible_path.node_passed is None:  # 没有找到可行路径
+            unscheduled.append(train.traNo)
+            print("no feasible path")
+            continue
         for node in train.feasible_path.node_passed:
             train.timetable[node[0]] = node[1]
+    return unscheduled
 
 
 # Labelling Algorithm
@@ -203,301 +152,212 @@ param:
 '''
 
 
-def label_correcting_shortest_path(summary_interval, org, des, train):
+def label_correcting_shortest_path(summary_interval, org, des, train, arc_costs):
     '''
     get the shortest path for the specific train
     :param summary_interval:
     :param org: source node name [sta, t]
     :param des: sink node name [sta, t]
     :param train: train to generate train time space network
+    :param arc_costs: flat arc cost array indexed by arc.index
     :return:
     '''
-    # initialize Queue
-    # c_time = time.time()
-    Queue = collections.deque()
-    SE_list = []
-    summary_interval = summary_interval
-    # create initial label
-    label = Label()
-    label.node_passed = [org]
-    Queue.append(label)  # add initial label into Queue, Queue存储各个label，各个label含各自的路径信息
-    Paths = []  # all complete paths
-    cnt = 0
-    cnt2 = 0
-    # main loop of the algorithm
-    while len(Queue) > 0:
-        current_path = Queue.pop()  # 当前的label
-        # extend the label
-        last_node_name = current_path.node_passed[-1]
-        last_node = nodeList[last_node_name[0]][last_node_name[1]]  # 当前点
-        if train.traNo in last_node.out_arcs.keys():  # 该节点有该列车的流出弧的话，才进行后续节点的加入
-            for out_arc in last_node.out_arcs[train.traNo].values():  # 遍历当前点的流出弧，找到下一节点
-                child_node = nodeList[out_arc.staBelong_next][out_arc.timeBelong_next].name
-                cnt2 += 1
-                extended_path = copy.deepcopy(current_path)  # 新label
-                extended_path.node_passed.append(child_node)
-                extended_path.cost += out_arc.arc_length
-                for occupy_node in out_arc.node_occupied:
-                    extended_path.cost += occupy_node.multiplier
-                
-                Queue.append(extended_path)
-                
-                # if child_node in SE_list:
-                #     Queue.appendleft(extended_path)
-                # else:
-                #     SE_list.append(child_node)
-                #     Queue.append(extended_path)
-                # if cnt2 % summary_interval == 0:
-                #     print('extended_path:', extended_path.__repr__())
-        
-        if current_path.node_passed[-1][0] == des[0]:  # 注意不能直接path[-1] == des，引用类型相同是判断地址相同
-            Paths.append(current_path)
-    
-    # choose optimal solution
-    opt_path = None
-    min_cost = 10000000
-    for path in Paths:
-        if path.cost < min_cost:
-            min_cost = path.cost
-            opt_path = path
-    path_cost = opt_path.cost
-    # a_time = time.time()
-    # print(a_time - c_time)
-    return opt_path, path_cost
+    opt_path = Label()
+    opt_path.node_passed, opt_path.cost = dag_shortest_path(org, des, train, arc_costs=arc_costs)
+    return opt_path, opt_path.cost
 
 
-def label_correcting_shortest_path_with_forbidden(summary_interval, org, des, train):
+def label_correcting_shortest_path_with_forbidden(summary_interval, org, des, train, arc_costs):
     '''
     get the shortest path for the specific train with the remained subgraph
     :param summary_interval:
     :param org: source node name [sta, t]
     :param des: sink node name [sta, t]
     :param train: train to generate train time space network
+    :param arc_costs: flat arc cost array indexed by arc.index
     :return:
     '''
-    # initialize Queue
-    # c_time = time.time()
-    Queue = collections.deque()
-    SE_list = []
-    summary_interval = summary_interval
-    # create initial label
-    label = Label()
-    label.node_passed = [org]
-    Queue.append(label)  # add initial label into Queue, Queue存储各个label，各个label含各自的路径信息
-    Paths = []  # all complete paths
-    cnt = 0
-    cnt2 = 0
-    # main loop of the algorithm
-    while len(Queue) > 0:
-        current_path = Queue.pop()  # 当前的label
-        # extend the label
-        last_node_name = current_path.node_passed[-1]
-        last_node = nodeList[last_node_name[0]][last_node_name[1]]  # 当前点
-        
-        if train.traNo in last_node.out_arcs.keys():  # 该节点有该列车的流出弧的话，才进行后续节点的加入
-            for out_arc in last_node.out_arcs[train.traNo].values():  # 遍历当前点的流出弧，找到下一节点
-                if nodeList[out_arc.staBelong_next][out_arc.timeBelong_next].isOccupied:  # 若下一节点已经被占用
-                    continue
-                child_node = nodeList[out_arc.staBelong_next][out_arc.timeBelong_next].name
-                cnt2 += 1
-                extended_path = copy.deepcopy(current_path)  # 新label
-                extended_path.node_passed.append(child_node)
-                extended_path.cost += out_arc.arc_length
-                for occupy_node in out_arc.node_occupied:
-                    extended_path.cost += occupy_node.multiplier
-                
-                # if child_node in SE_list:
-                #     Queue.appendleft(extended_path)
-                # else:
-                #     SE_list.append(child_node)
-                #     Queue.append(extended_path)
-                Queue.append(extended_path)
-                
-                # if cnt2 % summary_interval == 0:
-                #     print('extended_path:', extended_path.__repr__())
-        
-        if current_path.node_passed[-1][0] == des[0]:  # 注意不能直接path[-1] == des，引用类型相同是判断地址相同
-            Paths.append(current_path)
-    
-    # choose optimal solution
-    opt_path = None
-    min_cost = 10000000
-    for path in Paths:
-        if path.cost < min_cost:
-            min_cost = path.cost
-            opt_path = path
+    opt_path = Label()
+    opt_path.node_passed, opt_path.cost = dag_shortest_path(org, des, train, arc_costs=arc_costs, forbidden=True,
+                                                            occupation=occupation)
+    if opt_path.node_passed is None:  # 剩余网络中已无可行路径
+        return opt_path, float('inf')
     path_cost = opt_path.node_passed[-2][1] - opt_path.node_passed[1][1]
-    
-    # a_time = time.time()
-    # print(a_time - c_time)
     return opt_path, path_cost
 
 
-def update_lagrangian_multipliers(alpha):
-    total_cost = 0
-    for sta in v_staList:
-        if sta == v_staList[0] or sta == v_staList[-1]:  # s_和_t并没有乘子
-            continue
-        for node in nodeList[sta].values():  # 这个站的各个t的node
-            temp = 0
-            for arc in node.incompatible_arcs:
-                temp += arc.isChosen_LR
-            
-            node.multiplier = max(0, node.multiplier + alpha * (temp - 1))  # 1为node capacity
-            total_cost += node.multiplier
-    return total_cost
-
-
 def set_node_occupation(train):
-    for node_id in range(1, len(train.feasible_path.node_passed) - 2):
-        node = train.feasible_path.node_passed[node_id]
-        next_node = train.feasible_path.node_passed[node_id + 1]
-        for node in train.arcs[node[0], next_node[0]][node[1]][next_node[1] - node[1]].node_occupied:
-            node.isOccupied = True
-    train.last_feasible_path = copy.deepcopy(train.feasible_path)
+    if train.feasible_path.node_passed is None:
+        train.last_feasible_arcs = ()
+        return
+    train.last_feasible_arcs = train.path_arcs(train.feasible_path.node_passed)
+    occupation.occupy_arcs(train.last_feasible_arcs)
 
 
 def clear_node_occupation():
-    for train in trainList:
-        if train.last_feasible_path is not None:
-            for node_id in range(1, len(train.last_feasible_path.node_passed) - 2):
-                node = train.last_feasible_path.node_passed[node_id]
-                next_node = train.last_feasible_path.node_passed[node_id + 1]
-                for node in train.arcs[node[0], next_node[0]][node[1]][next_node[1] - node[1]].node_occupied:
-                    node.isOccupied = False
+    occupation.clear()
 
 
-read_station('data/station.csv')
-read_section('data/section.csv')
-read_train('data/train.csv')
-
-'''
-initialization
-'''
-# init_trains()
-init_nodes()
-add_arcs_to_nodes_by_flow()
-associate_arcs_nodes_by_resource_occupation()
+def lagrangian_relaxation(interval=10, step_rule=None, termination=None):
+    '''
+    Lagrangian relaxation approach on the network held by the module globals, the same loop as
+    main_slim.lagrangian_relaxation without its pricing options
+    :param interval: print the gap every interval iterations
+    :param step_rule: multiplier update strategy (see multiplier_update), 0.5 / (iter + 1) steps by default
+    :param termination: Termination (gap, iteration budget, time budget, patience), Termination() by default
+    :return: LB, UB (bounds of every iteration), gap of the best bounds; the trains are left with the feasible
+             paths of the best UB
+    '''
+    LB = []
+    UB = []
+    if step_rule is None:
+        step_rule = make_strategy('diminishing')
+    if termination is None:
+        termination = Termination()
+    org = nodeList['s_'][-1].name
+    des = nodeList['_t'][-1].name
+
+    best_solution = None  # 最好上界对应的各列车可行路径
+    iter = 0
+    while not termination.should_stop():
+        # LR: train sub-problems solving
+        with profiler.phase('lr_subproblems', iteration=iter):
+            arc_costs = incidence.reduced_costs(multiplier).tolist()  # 本轮各弧费用
+            path_cost_LR = 0
+            for train in trainList:
+                train.opt_path_LR, train.opt_cost_LR = label_correcting_shortest_path(20, org, des, train, arc_costs)
+                train.update_arc_chosen(arc_choice)  # LR中的arc_chosen，用于更新乘子
+                path_cost_LR += train.opt_cost_LR
 
-'''
-Lagrangian relaxation approach
-'''
-LB = []
-UB = []
-
-minGap = 0.1
-gap = 100
-alpha = 0
-iter = 0
-interval = 10
-while gap > minGap:
-    # LR: train sub-problems solving
-    path_cost_LR = 0
-    for train in trainList:
-        train.opt_path_LR, train.opt_cost_LR = label_correcting_shortest_path(20, nodeList['s_'][-1].name,
-                                                                              nodeList['_t'][-1].name, train)
-        train.update_arc_chosen()  # LR中的arc_chosen，用于更新乘子
-        path_cost_LR += train.opt_cost_LR
-    
-    # feasible solutions
-    path_cost_feasible = 0
-    for train in trainList:
-        train.feasible_path, train.feasible_cost = label_correcting_shortest_path_with_forbidden(20,
-                                                                                                 nodeList['s_'][
-                                                                                                     -1].name,
-                                                                                                 nodeList['_t'][
-                                                                                                     -1].name,
-                                                                                                 train)
-        set_node_occupation(train)  # 可行解不需要arc_chosen，用opt_path即可
-        path_cost_feasible += train.feasible_cost
-    clear_node_occupation()  # 清除不能在循环内，会将同一轮次的上一列车的占用给清空了
-    UB.append(path_cost_feasible)
-    
-    # update lagrangian multipliers
-    if iter < 20:
-        alpha = 0.5 / (iter + 1)
+        # feasible solutions
+        with profiler.phase('feasibility_repair', iteration=iter):
+            path_cost_feasible = 0
+            for train in trainList:
+                train.feasible_path, train.feasible_cost = label_correcting_shortest_path_with_forbidden(
+                    20, org, des, train, arc_costs)
+                set_node_occupation(train)  # 可行解不需要arc_chosen，用opt_path即可
+                path_cost_feasible += train.feasible_cost
+            clear_node_occupation()  # 清除不能在循环内，会将同一轮次的上一列车的占用给清空了
+            UB.append(path_cost_feasible)
+
+        # update lagrangian multipliers
+        with profiler.phase('multiplier_update', iteration=iter):
+            # 下界为当前乘子下的对偶函数值，需在乘子更新前计算；UB为inf、LB<=0时的间隙由 Termination.gap 处理
+            LB.append(path_cost_LR - multiplier.sum())
+            if termination.update(LB[-1], UB[-1]):
+                best_solution = [(train.feasible_path, train.feasible_cost, train.last_feasible_arcs)
+                                 for train in trainList]
+            step_rule.update(multiplier, arc_choice.subgradient(), LB[-1], termination.best_UB, iter)
+
+        iter += 1
+        if iter % interval == 0:
+            print("==================  iteration " + str(iter) + " ==================")
+            print("                 current gap: " + str(round(termination.gap() * 100, 5)) + "% \n")
+
+    if best_solution is not None:  # 输出最好上界的解，而非最后一轮的
+        for train, (path, cost, arcs) in zip(trainList, best_solution):
+            train.feasible_path, train.feasible_cost, train.last_feasible_arcs = path, cost, arcs
     else:
-        alpha = 0.5 / 20
-    multiplier_cost = update_lagrangian_multipliers(alpha)
-    LB.append(path_cost_LR - multiplier_cost)
-    
-    iter += 1
-    gap = (UB[-1] - LB[-1]) / LB[-1]
-    
-    if iter % interval == 0:
-        print("==================  iteration " + str(iter) + " ==================")
-        print("                 current gap: " + str(round(gap * 100, 5)) + "% \n")
+        print("no feasible solution found in " + str(iter) + " iterations")
+    print("LR stopped by " + str(termination.reason) + " after " + str(iter) + " iterations")
+    return LB, UB, termination.gap()
 
-get_train_timetable_from_result()
-print("================== solution found ==================")
-print("                 final gap: " + str(round(gap * 100, 5)) + "% \n")
 
-'''
-draw timetable
-'''
-fig = plt.figure(figsize=(7, 7), dpi=200)
-color_value = {
-    '0': 'midnightblue',
-    '1': 'mediumblue',
-    '2': 'c',
-    '3': 'orangered',
-    '4': 'm',
-    '5': 'fuchsia',
-    '6': 'olive'
-}
-
-xlist = []
-ylist = []
-for i in range(len(trainList)):
-    train = trainList[i]
+if __name__ == '__main__':
+    read_station('data/station.csv')
+    read_section('data/section.csv')
+    read_train('data/train.csv')
+
+    '''
+    initialization
+    '''
+    # init_trains()
+    init_nodes()
+    add_arcs_to_nodes_by_flow()
+    incidence = ArcNodeIncidence(v_staList[1:-1], TimeSpan).build(trainList)
+    multiplier = np.zeros((len(v_staList) - 2, TimeSpan))  # 乘子，按 (virtual station, t) 存储，station 对应 v_staList[1:-1]
+    arc_choice = ArcChoice(incidence)  # LR中选中的弧及各节点占用次数
+    occupation = NodeOccupation(incidence)  # 可行解阶段各节点是否已被占用
+
+    '''
+    Lagrangian relaxation approach
+    '''
+    minGap = 0.1
+    maxIter = 200  # 迭代上限，修复始终不可行（UB为inf）时也能停下
+    LB, UB, gap = lagrangian_relaxation(termination=Termination(minGap, maxIter))
+
+    get_train_timetable_from_result()
+    print("================== solution found ==================")
+    print("                 final gap: " + str(round(gap * 100, 5)) + "% \n")
+
+    '''
+    draw timetable
+    '''
+    fig = plt.figure(figsize=(7, 7), dpi=200)
+    color_value = {
+        '0': 'midnightblue',
+        '1': 'mediumblue',
+        '2': 'c',
+        '3': 'orangered',
+        '4': 'm',
+        '5': 'fuchsia',
+        '6': 'olive'
+    }
+
     xlist = []
     ylist = []
-    for sta_id in range(len(train.staList)):
-        sta = train.staList[sta_id]
-        if sta_id != 0:  # 不为首站, 有到达
-            if "_" + sta in train.v_staList:
-                xlist.append(train.timetable["_" + sta])
-                ylist.append(miles[staList.index(sta)])
-        if sta_id != len(train.staList) - 1:  # 不为末站，有出发
-            if sta + "_" in train.v_staList:
-                xlist.append(train.timetable[sta + "_"])
-                ylist.append(miles[staList.index(sta)])
-    plt.plot(xlist, ylist, color=color_value[str(i % 7)], linewidth=1.5)
-    plt.text(xlist[0] + 0.8, ylist[0] + 4, train.traNo, ha='center', va='bottom',
-             color=color_value[str(i % 7)], weight='bold', family='Times new roman', fontsize=9)
-
-plt.grid(True)  # show the grid
-plt.ylim(0, miles[-1])  # y range
-
-plt.xlim(0, TimeSpan)  # x range
-plt.xticks(np.linspace(0, TimeSpan, int(TimeSpan / 10 + 1)))
-
-plt.yticks(miles, staList, family='Times new roman')
-plt.xlabel('Time (min)', family='Times new roman')
-plt.ylabel('Space (km)', family='Times new roman')
-plt.show()
-
-end_time = time.time()
-time_elapsed = end_time - start_time
-print(time_elapsed)
-
-## plot the bound updates
-font_dic = {"family": 'Arial',
-            "style": "oblique",
-            "weight": "normal",
-            "color": "green",
-            "size": 20
-            }
-
-plt.rcParams['figure.figsize'] = (12.0, 8.0)
-plt.rcParams["font.family"] = 'Arial'
-plt.rcParams["font.size"] = 16
-
-x_cor = range(1, len(LB) + 1)
-plt.plot(x_cor, LB, label='LB')
-plt.plot(x_cor, UB, label='UB')
-plt.legend()
-plt.xlabel('Iteration', fontdict=font_dic)
-plt.ylabel('Bounds update', fontdict=font_dic)
-plt.title('LR: Bounds updates \n', fontsize=23)
-plt.show()
+    for i in range(len(trainList)):
+        train = trainList[i]
+        if not train.timetable:  # 没有可行路径的列车不画
+            continue
+        xlist = []
+        ylist = []
+        for sta_id in range(len(train.staList)):
+            sta = train.staList[sta_id]
+            if sta_id != 0:  # 不为首站, 有到达
+                if "_" + sta in train.v_staList:
+                    xlist.append(train.timetable["_" + sta])
+                    ylist.append(miles[staList.index(sta)])
+            if sta_id != len(train.staList) - 1:  # 不为末站，有出发
+                if sta + "_" in train.v_staList:
+                    xlist.append(train.timetable[sta + "_"])
+                    ylist.append(miles[staList.index(sta)])
+        plt.plot(xlist, ylist, color=color_value[str(i % 7)], linewidth=1.5)
+        plt.text(xlist[0] + 0.8, ylist[0] + 4, train.traNo, ha='center', va='bottom',
+                 color=color_value[str(i % 7)], weight='bold', family='Times new roman', fontsize=9)
+
+    plt.grid(True)  # show the grid
+    plt.ylim(0, miles[-1])  # y range
+
+    plt.xlim(0, TimeSpan)  # x range
+    plt.xticks(np.linspace(0, TimeSpan, int(TimeSpan / 10 + 1)))
+
+    plt.yticks(miles, staList, family='Times new roman')
+    plt.xlabel('Time (min)', family='Times new roman')
+    plt.ylabel('Space (km)', family='Times new roman')
+    plt.show()
+
+    end_time = time.time()
+    time_elapsed = end_time - start_time
+    print(time_elapsed)
+
+    ## plot the bound updates
+    font_dic = {"family": 'Arial',
+                "style": "oblique",
+                "weight": "normal",
+                "color": "green",
+                "size": 20
+                }
+
+    plt.rcParams['figure.figsize'] = (12.0, 8.0)
+    plt.rcParams["font.family"] = 'Arial'
+    plt.rcParams["font.size"] = 16
+
+    x_cor = range(1, len(LB) + 1)
+    plt.plot(x_cor, LB, label='LB')
+    plt.plot(x_cor, UB, label='UB')
+    plt.legend()
+    plt.xlabel('Iteration', fontdict=font_dic)
+    plt.ylabel('Bounds update', fontdict=font_dic)
+    plt.title('LR: Bounds updates \n', fontsize=23)
+    plt.show()
@@ -1,16 +1,23 @@
-import collections
-import re
-from Train import *
-from Node import *
-import copy
+from Arc import ArcStore
+from Train import Train
+from Node import Node, StationNodes
+from shortest_path import dag_shortest_path, WarmStartPricing
+from labelling import resource_constrained_shortest_path, resource_cost, train_resources
+from incidence import ArcNodeIncidence, ArcChoice, NodeOccupation
+from parallel_pricing import ParallelPricing
+from batched_pricing import BatchedPricing
+from profiling import profiler
+from multiplier_update import make_strategy
+from termination import Termination
+import loader
+import network_cache
 import matplotlib.pyplot as plt
 import numpy as np
 import time
-import pandas as pd
 from collections import defaultdict
 import logging
-import sys
 import os
+import gc
 
 logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO)
 logger = logging.getLogger("railway")
@@ -27,13 +34,18 @@ train_list = []
 node_list = {}  # 先用车站做key，再用t做key索引到node
 start_time = time.time()
 sec_times_all = {}
-multiplier = {}  # each (station, t)
+multiplier = None  # 乘子，按 (virtual station, t) 存储，station 对应 v_station_list[1:-1]
 yv2xa_map = defaultdict(lambda: defaultdict(int))  # (s,t) node -> (s', t', s, t) arc : value
+arc_store = None  # ArcStore, 列存储模式下所有列车的弧
+frozen_nodes = []  # (sta, t) 滚动时域中之前窗口已固定的列车占用的节点，求解中始终保持占用
+occupation = None  # NodeOccupation, 可行解阶段各节点是否已被占用
+arc_templates = None  # dict, 停站方案/速度/时间窗相同的列车共用一份弧（见 Train.share_arcs），None 为不共用
 
 
+@profiler.timed()
 def read_station(path, size):
     global miles, v_station_list, station_list
-    df = pd.read_excel(path).sort_values('站名')
+    df = loader.read_table(path).sort_values('站名')
     df = df.iloc[:size, :]
     miles = df['里程'].values
     station_list = df['站名'].astype(str).to_list()
@@ -46,117 +58,96 @@ def read_station(path, size):
     v_station_list.append('_t')
 
 
+@profiler.timed()
 def read_section(path):
-    df = pd.read_excel(path).assign(
+    df = loader.read_table(path).assign(
         interval=lambda dfs: dfs['区间名'].apply(lambda x: tuple(x.split("-")))
     ).set_index("interval")
     global sec_times, sec_times_all
-    sec_times = df[350].to_dict()
+    sec_times = df['350'].to_dict()  # 列名统一为 str
     sec_times_all = df.to_dict()
 
 
-def parse_row_to_train(row):
-    tr = Train(row['车次ID'], 0, time_span)
-    tr.preferred_time = row['偏好始发时间']
-    tr.up = row['上下行']
-    tr.standard = row['标杆车']
-    tr.speed = row['速度']
+def create_train(traNo, preferred_time, up, standard, speed, line_plan, dep_LB=0, dep_UB=None, time_scale=1,
+                 corridor=None):
+    tr = Train(traNo, dep_LB, time_span if dep_UB is None else dep_UB)
+    tr.preferred_time = preferred_time
+    tr.up = up
+    tr.standard = standard
+    tr.speed = speed
     # todo, what does -1 mean?
-    tr.linePlan = {k: max(row[k], 0) for k in station_list}
+    tr.linePlan = line_plan
     tr.init_traStaList(station_list)
-    tr.create_arcs_LR(sec_times, time_span)
+    if time_scale != 1:  # 粗粒度时间网格
+        tr.scale_time(time_scale)
+    tr.corridor = corridor
+    tr.create_arcs_LR(sec_times, time_span, arc_store, arc_templates)
     return tr
 
 
-def read_train(path, size=10):
-    df = pd.read_excel(path, dtype={"车次ID": str})
-    df = df.rename(columns={k: str(k) for k in df.columns})
+def read_train_rows(path, size=10):
+    '''
+    line plan table as create_train arguments, no arc is created
+    :return: list of (traNo, preferred_time, up, standard, speed, line_plan)
+    '''
+    df = loader.read_table(path, dtype={"车次ID": str})
     df = df.iloc[:size, :]
-    train_series = df.apply(lambda row: parse_row_to_train(row), axis=1)
+    line_plans = loader.line_plans(loader.stop_matrix(df, station_list), station_list)  # 负值按0计
+    return list(zip(df['车次ID'].tolist(), df['偏好始发时间'].tolist(), df['上下行'].tolist(), df['标杆车'].tolist(),
+                    df['速度'].tolist(), line_plans))
+
+
+@profiler.timed()
+def read_train(path, size=10):
     global train_list
-    train_list = train_series.to_list()
+    train_list = [create_train(*row) for row in read_train_rows(path, size)]
+    if arc_store is not None:
+        arc_store.freeze()
 
 
+@profiler.timed()
 def init_nodes():
     '''
     initialize nodes, associated with incoming nad outgoing train arcs
     '''
+    global multiplier
+    multiplier = np.zeros((len(v_station_list) - 2, time_span))
     # source node
     node_list['s_'] = {}
     node_list['s_'][-1] = Node('s_', -1)
-    # initialize node dictionary with key [sta][t]
+    # initialize node dictionary with key [sta][t], nodes are created lazily on first access
     for sta in v_station_list:  # 循环车站
-        node_list[sta] = {}
-        for t in range(0, time_span):  # 循环时刻t
-            node = Node(sta, t)
-            node_list[sta][t] = node
-            multiplier[(sta, t)] = 0.0
+        node_list[sta] = StationNodes(sta, time_span)
     # sink node
     node_list['_t'] = {}
     node_list['_t'][-1] = Node('_t', -1)
 
 
+@profiler.timed()
 def add_arcs_to_nodes_by_flow():
-    # associate node with train arcs, add incoming and outgoing arcs to nodes
-    for nodes_sta in node_list.values():
-        for node in nodes_sta.values():
-            for train in train_list:
-                node.associate_with_outgoing_arcs(train)
-                node.associate_with_incoming_arcs(train)
-
-
-# 通过列车弧的资源占用特性，将arc与node的关系建立
-def associate_arcs_nodes_by_resource_occupation():
-    for sta in v_station_list:
-        if sta != v_station_list[0] and sta.endswith('_'):  # all section departure stations
-            for t in range(0, time_span):
-                # 先用车站做key，再用t做key索引到node
-                cur_node = node_list[sta][t]
-
-                if len(cur_node.out_arcs) == 0:  # 没有弧
-                    continue
-
-                for tra in cur_node.out_arcs.keys():  # 先索引包含的列车
-                    for out_arc in cur_node.out_arcs[tra].values():  # 遍历这个列车在这个点的所有弧
-                        before_occupy = out_arc.before_occupy_dep
-                        after_occupy = out_arc.after_occupy_dep
-                        for i in range(0, before_occupy + 1):  # 前面节点占用，在这里把自己加上，可以取到0
-                            if t - i >= 0:
-                                node_list[sta][t - i].incompatible_arcs.append(out_arc)
-                                out_arc.node_occupied.append(node_list[sta][t - i])
-                            else:
-                                break
-                        for i in range(1, after_occupy + 1):  # 后面节点占用，这里就不取0了
-                            if t + i < time_span:
-                                node_list[sta][t + i].incompatible_arcs.append(out_arc)
-                                out_arc.node_occupied.append(node_list[sta][t + i])
-                            else:
-                                break
-
-        elif sta != v_station_list[-1] and sta.startswith('_'):  # all section arrival stations
-            for t in range(0, time_span):
-                # 先用车站做key，再用t做key索引到node
-                cur_node = node_list[sta][t]
-
-                if len(cur_node.in_arcs) == 0:  # 没有弧
-                    continue
-
-                for tra in cur_node.in_arcs.keys():  # 先索引包含的列车
-                    for in_arc in cur_node.in_arcs[tra].values():  # 遍历这个列车在这个点的所有弧
-                        before_occupy = in_arc.before_occupy_arr
-                        after_occupy = in_arc.after_occupy_arr
-                        for i in range(0, before_occupy + 1):  # 前面节点占用
-                            if t - i >= 0:
-                                node_list[sta][t - i].incompatible_arcs.append(in_arc)
-                                in_arc.node_occupied.append(node_list[sta][t - i])
-                            else:
-                                break
-                        for i in range(1, after_occupy + 1):  # 后面节点占用
-                            if t + i < time_span:
-                                node_list[sta][t + i].incompatible_arcs.append(in_arc)
-                                in_arc.node_occupied.append(node_list[sta][t + i])
-                            else:
-                                break
+    '''
+    associate node with train arcs, add incoming and outgoing arcs to nodes
+    one pass over each train's arcs, every arc is pushed into its tail and head nodes directly
+    '''
+    for train in train_list:
+        if train.template is not None:  # 共用的弧已由 template 关联，再关联会重复占用
+            continue
+        # train arc structure: key：[dep, arr], value为弧集字典(key: [t], value: arc字典, key为arc_length)
+        for (dep, arr), cur_arcs in train.arcs.items():
+            for start_t, arcs_from_start_t in cur_arcs.items():
+                tail_node = node_list[dep].get(start_t)
+                if tail_node is not None:  # 流出弧
+                    tail_node.out_arcs[train.traNo] = {}
+                for arc_length, arc in arcs_from_start_t.items():
+                    train.add_subgraph_edge(arc)
+                    if tail_node is not None:
+                        tail_node.out_arcs[train.traNo][arc_length] = arc
+                    head_node = node_list[arr].get(start_t + arc_length)  # 弧的头节点时刻为 start_t + span
+                    if head_node is not None:  # 流入弧
+                        if train.traNo not in head_node.in_arcs.keys():
+                            head_node.in_arcs[train.traNo] = {}
+                        head_node.in_arcs[train.traNo][arc_length] = arc
+                        yv2xa_map[(arc.staBelong_next, arc.timeBelong_next)][(arc.staBelong_pre, arc.timeBelong_pre, arc.staBelong_next, arc.timeBelong_next)] += 1
 
 
 # def get_train_timetable_from_result():
@@ -172,10 +163,22 @@ def associate_arcs_nodes_by_resource_occupation():
 #                         train.timetable[curSta] = t
 #                         train.timetable[nextSta] = t + arc_length
 def get_train_timetable_from_result():
+    '''
+    timetable of every train from its feasible path, trains left without one are reported and skipped
+    :return: traNo of the trains without a feasible path
+    '''
+    unscheduled = []
     for train in train_list:
         print("===============Tra_" + train.traNo + "======================")
+        train.timetable = {}
+        if train.feasible_path is None or train.feasible_path.node_passed is None:  # 没有找到可行路径
+            unscheduled.append(train.traNo)
+            continue
         for node in train.feasible_path.node_passed:
             train.timetable[node[0]] = node[1]
+    if unscheduled:
+        logger.warning(f"no feasible path for trains {unscheduled}, left out of the timetable")
+    return unscheduled
 
 
 # Labelling Algorithm
@@ -203,121 +206,382 @@ param:
 '''
 
 
-def label_correcting_shortest_path(summary_interval, org, des, train):
-    pass
-    # todo
+def train_shortest_path(org, des, train, arc_costs, forbidden=False):
+    '''
+    DAG shortest path of a train, by the labelling algorithm when the train has side resources (train.resources)
+    :param forbidden: skip arcs into nodes occupied in node_occupation()
+    :return: node_passed, cost
+    :raise ValueError: without forbidden, if no path of the train satisfies its resource limits
+    '''
+    occupation = node_occupation() if forbidden else None
+    if train.resources:
+        node_passed, cost = resource_constrained_shortest_path(org, des, train, arc_costs, occupation=occupation)
+        if node_passed is None and not forbidden:  # 资源上限本身使该列车无路可走，与节点占用无关
+            raise ValueError(f"train {train.traNo} has no path within its resource limits {list(train.resources)}")
+        return node_passed, cost
+    return dag_shortest_path(org, des, train, arc_costs=arc_costs, forbidden=forbidden, occupation=occupation)
+
+
+def label_correcting_shortest_path(summary_interval, org, des, train, arc_costs):
+    '''
+    get the shortest path for the specific train
+    :param summary_interval:
+    :param org: source node name [sta, t]
+    :param des: sink node name [sta, t]
+    :param train: train to generate train time space network
+    :param arc_costs: flat arc cost array indexed by arc.index
+    :return:
+    '''
+    opt_path = Label()
+    opt_path.node_passed = None
+    if frozen_nodes:  # 已固定列车占用的节点不能再用，没有可行路径时再放开
+        opt_path.node_passed, opt_path.cost = train_shortest_path(org, des, train, arc_costs, forbidden=True)
+    if opt_path.node_passed is None:
+        opt_path.node_passed, opt_path.cost = train_shortest_path(org, des, train, arc_costs)
+    return opt_path, opt_path.cost
 
 
-def label_correcting_shortest_path_with_forbidden(summary_interval, org, des, train):
-    pass
-    # todo
+def label_correcting_shortest_path_with_forbidden(summary_interval, org, des, train, arc_costs):
+    '''
+    get the shortest path for the specific train with the remained subgraph
+    :param summary_interval:
+    :param org: source node name [sta, t]
+    :param des: sink node name [sta, t]
+    :param train: train to generate train time space network
+    :param arc_costs: flat arc cost array indexed by arc.index
+    :return:
+    '''
+    opt_path = Label()
+    opt_path.node_passed, opt_path.cost = train_shortest_path(org, des, train, arc_costs, forbidden=True)
+    if opt_path.node_passed is None:  # 剩余网络中已无可行路径
+        return opt_path, float('inf')
+    path_cost = opt_path.node_passed[-2][1] - opt_path.node_passed[1][1]
+    if train.resources:  # 与LR子问题的目标一致，计入资源费用
+        path_cost += resource_cost(opt_path.node_passed, train.resources)
+    return opt_path, path_cost
 
 
 def update_lagrangian_multipliers(alpha):
-    total_cost = 0
-    for sta in v_station_list:
-        if sta == v_station_list[0] or sta == v_station_list[-1]:  # s_和_t并没有乘子
-            continue
-        for node in node_list[sta].values():  # 这个站的各个t的node
-            temp = 0
-            for arc in node.incompatible_arcs:
-                temp += arc.isChosen_LR
+    '''
+    projected subgradient step on all node multipliers at once
+    :param alpha: step size
+    :return: sum of multipliers
+    '''
+    subgradient = arc_choice.subgradient()
+    np.maximum(0, multiplier + alpha * subgradient, out=multiplier)
+    return multiplier.sum()
 
-            node.multiplier = max(0, node.multiplier + alpha * (temp - 1))  # 1为node capacity
-            total_cost += node.multiplier
-    return total_cost
+
+def node_occupation():
+    '''
+    NodeOccupation of the current incidence, created on first use
+    '''
+    global occupation
+    if occupation is None or occupation.incidence is not incidence:
+        occupation = NodeOccupation(incidence)
+    return occupation
 
 
 def set_node_occupation(train):
-    for node_id in range(1, len(train.feasible_path.node_passed) - 2):
-        node = train.feasible_path.node_passed[node_id]
-        next_node = train.feasible_path.node_passed[node_id + 1]
-        for node in train.arcs[node[0], next_node[0]][node[1]][next_node[1] - node[1]].node_occupied:
-            node.isOccupied = True
-    train.last_feasible_path = copy.deepcopy(train.feasible_path)
+    if train.feasible_path.node_passed is None:
+        train.last_feasible_arcs = ()
+        return
+    train.last_feasible_arcs = train.path_arcs(train.feasible_path.node_passed)
+    node_occupation().occupy_arcs(train.last_feasible_arcs)
 
 
 def clear_node_occupation():
-    for train in train_list:
-        if train.last_feasible_path is not None:
-            for node_id in range(1, len(train.last_feasible_path.node_passed) - 2):
-                node = train.last_feasible_path.node_passed[node_id]
-                next_node = train.last_feasible_path.node_passed[node_id + 1]
-                for node in train.arcs[node[0], next_node[0]][node[1]][next_node[1] - node[1]].node_occupied:
-                    node.isOccupied = False
+    node_occupation().clear()
+    occupy_frozen_nodes()
 
 
-if __name__ == '__main__':
+def occupy_frozen_nodes():
+    if frozen_nodes:
+        node_occupation().occupy_nodes([incidence.node_index(sta, t) for sta, t in frozen_nodes])
 
-    station_size = int(os.environ.get('station_size', 30))
-    train_size = int(os.environ.get('train_size', 5))
-    time_span = int(os.environ.get('time_span', 500))
-    logger.info(f"size: #train,#station,#timespan: {train_size, station_size, time_span}")
-    read_station('raw_data/1-station.xlsx', station_size)
-    read_section('raw_data/3-section-time.xlsx')
-    read_train('raw_data/6-lineplan-down.xlsx', train_size)
 
+def release_network():
+    '''
+    drop the trains, nodes and incidence built for the current network
+    '''
+    global train_list, incidence, arc_choice, occupation, multiplier, frozen_nodes, arc_store, arc_templates
+    train_list = []
+    node_list.clear()
+    yv2xa_map.clear()
+    incidence = None
+    arc_choice = None
+    occupation = None
+    multiplier = None
+    frozen_nodes = []
+    if arc_store is not None:
+        arc_store = ArcStore()
+    if arc_templates is not None:
+        arc_templates = {}
+    gc.collect()  # 节点与弧相互引用，及时回收
+
+
+@profiler.timed()
+def prune_dead_arcs():
+    '''
+    drop the arcs of every train that lie on no source-sink path (forward/backward reachability on the train
+    network), with their in/out arc links to nodes if these are built already;
+    arcs must not be numbered in the incidence yet
+    :return: number of arcs dropped
     '''
-    initialization
+    if arc_store is not None:
+        keep = np.ones(len(arc_store), dtype=bool)
+        for train in train_list:
+            adj = train.adjacency()
+            keep[adj.arc_ids[~adj.live_arcs()]] = False
+        n_dropped = int(len(keep) - keep.sum())
+        if n_dropped:
+            arc_store.compact(keep)
+        return n_dropped
+    n_dropped = 0
+    for train in train_list:
+        for dep, arr, t, span, arc in train.prune_dead_arcs():
+            n_dropped += 1
+            tail_node = node_list.get(dep, {}).get(t)
+            if tail_node is not None and train.traNo in tail_node.out_arcs:
+                tail_node.out_arcs[train.traNo].pop(span, None)
+            head_node = node_list.get(arr, {}).get(arc.timeBelong_next)
+            if head_node is not None and train.traNo in head_node.in_arcs:
+                head_node.in_arcs[train.traNo].pop(span, None)
+    return n_dropped
+
+
+def build_network(prune=True):
+    '''
+    initialization: nodes, arc-node flow links and the arc-node incidence of train_list, which holds the headway
+    occupation of every arc as node intervals
+    :param prune: drop the arcs on no source-sink path first (see prune_dead_arcs)
+    :return: ArcNodeIncidence
     '''
-    logger.info("reading finish")
     # init_trains()
+    if prune:
+        logger.info(f"{prune_dead_arcs()} dead arcs pruned")
     init_nodes()
     logger.info("step 1")
-    add_arcs_to_nodes_by_flow()
-    logger.info("step 2")
-    associate_arcs_nodes_by_resource_occupation()
-    logger.info("step 3")
+    if arc_store is None:
+        add_arcs_to_nodes_by_flow()
+        logger.info("step 2")
+        with profiler.phase('build_incidence'):
+            return ArcNodeIncidence(v_station_list[1:-1], time_span).build(train_list)
+    with profiler.phase('build_incidence'):  # 求解只用到关联矩阵，节点上的弧集不再建立
+        return ArcNodeIncidence(v_station_list[1:-1], time_span).build_from_store(arc_store)
+
+
+def repair_priority(order='fixed'):
+    '''
+    train order of the feasible solution phase
+    :param order: 'fixed': train_list order; 'reduced_cost': highest LR path cost first;
+                  'conflict': most LR path nodes shared with other trains first, ties by LR path cost
+    :return: list of trains
+    '''
+    if order == 'fixed':
+        return list(train_list)
+    if order == 'reduced_cost':
+        return sorted(train_list, key=lambda train: -train.opt_cost_LR)
+    if order == 'conflict':
+        # 各弧占用的节点中被多列车同时使用的个数
+        arc_conflicts = incidence.count_on_nodes(arc_choice.usage > 1)
+        conflicts = {train.traNo: arc_conflicts[list(train.opt_arcs_LR)].sum() for train in train_list}
+        return sorted(train_list, key=lambda train: (-conflicts[train.traNo], -train.opt_cost_LR))
+    raise ValueError(f"unknown repair order: {order}")
+
+
+def path_is_free(path):
+    '''
+    whether a path avoids every occupied node, the same check as the forbidden search
+    '''
+    if path is None or path.node_passed is None:
+        return False
+    return node_occupation().is_free([incidence.node_index(sta, t) for sta, t in path.node_passed[1:-1]])
+
+
+def feasible_solutions(arc_costs, order='fixed', memoize=False):
+    '''
+    each train takes its shortest path in the network left by the trains before it
+    :param arc_costs: flat arc cost array indexed by arc.index
+    :param order: see repair_priority
+    :param memoize: heuristic reuse: keep the last feasible path of a train while its LR path is the same and no
+                    train before it occupies a node on it, only the other trains are searched again. The kept path is
+                    not searched again under the current arc_costs, nor when nodes freed by the trains before it would
+                    open a better one, so the upper bound can be worse than a full repair (the best UB over all
+                    iterations is kept by Termination)
+    :return: total cost of the feasible solution
+    '''
+    path_cost_feasible = 0
+    for train in repair_priority(order):
+        if memoize and train.feasible_key == train.opt_arcs_LR and path_is_free(train.feasible_path):
+            profiler.count('repair_reused')  # 沿用上一轮的可行路径
+        else:
+            train.feasible_path, train.feasible_cost = label_correcting_shortest_path_with_forbidden(
+                20, node_list['s_'][-1].name, node_list['_t'][-1].name, train, arc_costs)
+            train.feasible_key = train.opt_arcs_LR
+        set_node_occupation(train)  # 可行解不需要arc_chosen，用opt_path即可
+        path_cost_feasible += train.feasible_cost
+    clear_node_occupation()  # 清除不能在循环内，会将同一轮次的上一列车的占用给清空了
+    return path_cost_feasible
 
+
+def lagrangian_relaxation(min_gap=0.1, max_iter=None, pricing=None, warm_start=None, interval=10, repair_order='fixed',
+                          repair_memo=False, step_rule=None, termination=None):
     '''
-    Lagrangian relaxation approach
+    Lagrangian relaxation approach, on the network held by the module globals
+    :param min_gap: stop when (best UB - best LB) / best LB drops to min_gap
+    :param max_iter: stop after max_iter iterations, None for no limit
+    :param pricing: ParallelPricing, solves the LR sub-problems in worker processes
+    :param warm_start: WarmStartPricing, used when pricing is None; with tolerance > 0 the LB of an iteration is
+                       the dual value at its reference multipliers (see WarmStartPricing)
+    :param interval: print the gap every interval iterations
+    :param repair_order: train order of the feasible solution phase, see feasible_solutions
+    :param repair_memo: reuse feasible paths between iterations, a heuristic that can give a worse UB, see
+                        feasible_solutions
+    :param step_rule: multiplier update strategy (see multiplier_update), 0.5 / (iter + 1) steps by default
+    :param termination: Termination, replaces min_gap and max_iter (time budget, patience)
+    :return: LB, UB (bounds of every iteration), gap of the best bounds; the trains are left with the feasible
+             paths of the best UB, or of the last iteration (some of them None) if no finite UB was found
     '''
     LB = []
     UB = []
+    if step_rule is None:
+        step_rule = make_strategy('diminishing')
+    if termination is None:
+        termination = Termination(min_gap, max_iter)
 
-    minGap = 0.1
-    gap = 100
-    alpha = 0
+    best_solution = None  # 最好上界对应的各列车可行路径
     iter = 0
-    interval = 10
-    while gap > minGap:
+    while not termination.should_stop():
         # LR: train sub-problems solving
-        path_cost_LR = 0
-        for train in train_list:
-            train.opt_path_LR, train.opt_cost_LR = label_correcting_shortest_path(20, node_list['s_'][-1].name,
-                                                                                  node_list['_t'][-1].name, train)
-            train.update_arc_chosen()  # LR中的arc_chosen，用于更新乘子
-            path_cost_LR += train.opt_cost_LR
+        with profiler.phase('lr_subproblems', iteration=iter):
+            arc_costs = incidence.reduced_costs(multiplier).tolist()  # 本轮各弧费用
+            path_cost_LR = 0
+            solutions = None
+            bound_multiplier = multiplier  # 本轮各列车子问题的解所对应的乘子
+            if pricing is not None:
+                solutions = pricing.solve(multiplier)  # 各列车子问题并行求解
+            elif warm_start is not None:
+                solutions = warm_start.solve(multiplier)  # 只从乘子有变化的层开始重算
+                bound_multiplier = warm_start.reference  # 容差内的乘子变化未计入，解只对参考乘子最优
+            for train_id, train in enumerate(train_list):
+                if solutions is not None:
+                    train.opt_path_LR = Label()
+                    train.opt_path_LR.node_passed, train.opt_path_LR.cost = solutions[train_id]
+                    train.opt_cost_LR = train.opt_path_LR.cost
+                else:
+                    train.opt_path_LR, train.opt_cost_LR = label_correcting_shortest_path(20, node_list['s_'][-1].name,
+                                                                                          node_list['_t'][-1].name, train,
+                                                                                          arc_costs)
+                train.update_arc_chosen(arc_choice)  # LR中的arc_chosen，用于更新乘子
+                path_cost_LR += train.opt_cost_LR
 
         # feasible solutions
-        path_cost_feasible = 0
-        for train in train_list:
-            train.feasible_path, train.feasible_cost = label_correcting_shortest_path_with_forbidden(20,
-                                                                                                     node_list['s_'][
-                                                                                                         -1].name,
-                                                                                                     node_list['_t'][
-                                                                                                         -1].name,
-                                                                                                     train)
-            set_node_occupation(train)  # 可行解不需要arc_chosen，用opt_path即可
-            path_cost_feasible += train.feasible_cost
-        clear_node_occupation()  # 清除不能在循环内，会将同一轮次的上一列车的占用给清空了
-        UB.append(path_cost_feasible)
+        with profiler.phase('feasibility_repair', iteration=iter):
+            path_cost_feasible = feasible_solutions(arc_costs, repair_order, repair_memo)
+            UB.append(path_cost_feasible)
 
         # update lagrangian multipliers
-        if iter < 20:
-            alpha = 0.5 / (iter + 1)
-        else:
-            alpha = 0.5 / 20
-        multiplier_cost = update_lagrangian_multipliers(alpha)
-        LB.append(path_cost_LR - multiplier_cost)
+        with profiler.phase('multiplier_update', iteration=iter):
+            # 下界为解所对应乘子下的对偶函数值，需在乘子更新前计算
+            LB.append(path_cost_LR - bound_multiplier.sum())
+            if termination.update(LB[-1], UB[-1]):
+                best_solution = [(train.feasible_path, train.feasible_cost, train.last_feasible_arcs)
+                                 for train in train_list]
+            step_rule.update(multiplier, arc_choice.subgradient(), LB[-1], termination.best_UB, iter)
 
         iter += 1
-        gap = (UB[-1] - LB[-1]) / LB[-1]
+        gap = termination.gap()
 
         if iter % interval == 0:
             print("==================  iteration " + str(iter) + " ==================")
             print("                 current gap: " + str(round(gap * 100, 5)) + "% \n")
 
+    if best_solution is not None:  # 输出最好上界的解，而非最后一轮的
+        for train, (path, cost, arcs) in zip(train_list, best_solution):
+            train.feasible_path, train.feasible_cost, train.last_feasible_arcs = path, cost, arcs
+    else:
+        logger.warning(f"no feasible solution found in {iter} iterations, UB is inf")
+    logger.info(f"LR stopped by {termination.reason} after {iter} iterations, best UB at iteration "
+                f"{termination.best_UB_iter}")
+    return LB, UB, termination.gap()
+
+
+if __name__ == '__main__':
+
+    station_size = int(os.environ.get('station_size', 30))
+    train_size = int(os.environ.get('train_size', 5))
+    time_span = int(os.environ.get('time_span', 500))
+    n_workers = int(os.environ.get('n_workers', 0))  # LR子问题并行的进程数，0为串行
+    warm_start_tol = float(os.environ.get('warm_start_tol', -1))  # LR子问题热启动时乘子变化的容差，<0 不热启动
+    batched = bool(int(os.environ.get('batched_pricing', 0)))  # 车站序列相同的列车在一个矩阵上批量求LR子问题
+    repair_order = os.environ.get('repair_order', 'fixed')  # 可行解阶段的列车顺序: fixed / reduced_cost / conflict
+    repair_memo = bool(int(os.environ.get('repair_memo', 0)))  # 可行解阶段沿用未受影响列车的上一轮路径（启发式，上界可能变差）
+    step_rule = os.environ.get('step_rule', 'diminishing')  # 乘子更新策略: diminishing / polyak / deflected / bundle
+    min_gap = float(os.environ.get('min_gap', 0.1))
+    max_iter = int(os.environ['max_iter']) if 'max_iter' in os.environ else None
+    time_limit = float(os.environ['time_limit']) if 'time_limit' in os.environ else None  # 秒
+    patience = int(os.environ['patience']) if 'patience' in os.environ else None  # 上下界连续多少轮无改进即停止
+    trace_path = os.environ.get('trace')  # 各阶段计时/计数/内存的埋点输出，.json 为 Chrome trace，否则为 JSONL
+    if trace_path:
+        profiler.enable()
+    Train.build_subgraph = bool(int(os.environ.get('networkx', 1)))  # 0: 不建每列车的 networkx 子图，用 train.adjacency()
+    if int(os.environ.get('arc_templates', 0)):  # 相同停站方案、速度、时间窗的列车共用一份弧
+        arc_templates = {}
+    prune = bool(int(os.environ.get('prune', 1)))  # 建关联矩阵前删去不在任何源-汇路径上的弧
+    network_cache_dir = os.environ.get('network_cache')  # 建好的网络缓存目录，需要列存储模式
+    if int(os.environ.get('arc_store', 0)) or network_cache_dir:  # 弧用列存储，不建Arc对象
+        arc_store = ArcStore()
+    logger.info(f"size: #train,#station,#timespan: {train_size, station_size, time_span}")
+    input_paths = ('raw_data/1-station.xlsx', 'raw_data/3-section-time.xlsx', 'raw_data/6-lineplan-down.xlsx')
+    cache_file = None
+    if network_cache_dir:
+        os.makedirs(network_cache_dir, exist_ok=True)
+        cache_file = network_cache.cache_path(network_cache_dir, network_cache.cache_key(
+            input_paths, time_span=time_span, station_size=station_size, train_size=train_size,
+            arc_templates=arc_templates is not None, prune=prune))
+    if cache_file is not None and os.path.exists(cache_file):
+        with profiler.phase('load_network_cache'):
+            station_list, v_station_list, miles, sec_times, train_list, arc_store, incidence = \
+                network_cache.load_network(cache_file)
+        init_nodes()
+        logger.info(f"network loaded from {cache_file}")
+    else:
+        read_station(input_paths[0], station_size)
+        read_section(input_paths[1])
+        read_train(input_paths[2], train_size)
+
+        logger.info("reading finish")
+        incidence = build_network(prune)
+        if cache_file is not None:
+            network_cache.save_network(cache_file, station_list, v_station_list, miles, sec_times, train_list,
+                                       incidence)
+    arc_choice = ArcChoice(incidence)  # LR中选中的弧及各节点占用次数
+    logger.info("step 4")
+    # 最短路附加资源: 总停站时间上限、始发时刻偏离 preferred_time 的上限/每分钟费用
+    resource_limits = {name: float(os.environ[name]) for name in ('max_dwell', 'max_deviation', 'deviation_weight')
+                       if name in os.environ}
+    if resource_limits:
+        for train in train_list:
+            train.resources = train_resources(train, **resource_limits)
+        if n_workers > 0 or warm_start_tol >= 0 or batched:
+            logger.warning("parallel / warm start / batched pricing ignore train resources, LR sub-problems are "
+                           "solved serially")
+            n_workers, warm_start_tol, batched = 0, -1, False
+    pricing = ParallelPricing(train_list, incidence, n_workers) if n_workers > 0 else None
+    if batched and pricing is None:
+        pricing = BatchedPricing(train_list, incidence)
+    warm_start = WarmStartPricing(train_list, incidence, warm_start_tol) if warm_start_tol >= 0 else None
+
+    termination = Termination(min_gap, max_iter, time_limit, patience)
+    LB, UB, gap = lagrangian_relaxation(pricing=pricing, warm_start=warm_start, repair_order=repair_order,
+                                        repair_memo=repair_memo, step_rule=make_strategy(step_rule),
+                                        termination=termination)
+
+    if pricing is not None:
+        pricing.shutdown()
+    if trace_path:
+        profiler.dump(trace_path)
     get_train_timetable_from_result()
     print("================== solution found ==================")
     print("                 final gap: " + str(round(gap * 100, 5)) + "% \n")
@@ -343,6 +607,8 @@ if __name__ == '__main__':
     ylist = []
     for i in range(len(train_list)):
         train = train_list[i]
+        if not train.timetable:  # 没有可行路径的列车不画
+            continue
         xlist = []
         ylist = []
         for sta_id in range(len(train.staList)):
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# 两级时间粒度求解：先在粗网格（每格 factor 分钟，运行/停站/间隔时间按格数向上取整）上做LR，
+# 再以粗解为中心，给每列车在各站划出一个时刻范围（走廊），只在走廊内建1分钟粒度的弧做LR
+# usage: time_scale=5 corridor_width=5 python multi_resolution.py
+import logging
+import os
+
+import main_slim as ms
+from Arc import ArcStore
+from incidence import ArcChoice
+from Train import Train
+
+logger = logging.getLogger("railway")
+
+
+def coarse_sec_times(sec_times, factor):
+    return {sec: -(-run_time // factor) for sec, run_time in sec_times.items()}
+
+
+def solution_times(train):
+    '''
+    times of the feasible path of a train, or of its LR path if it has no feasible one
+    :return: {sta: t}, None if the train has no path at all
+    '''
+    for path in (train.feasible_path, train.opt_path_LR):
+        if path is not None and path.node_passed is not None:
+            return {sta: t for sta, t in path.node_passed[1:-1]}
+    return None
+
+
+def corridor_of(row, coarse_times, factor, width, sec_times):
+    '''
+    1-minute time range of a train at every virtual station around its coarse solution. The range holds the path
+    that departs at the coarse departure and runs with the shortest times, so the refined network is never empty
+    :param row: read_train_rows row
+    :param coarse_times: {sta: coarse t}
+    :param factor: minutes per coarse step
+    :param width: extra minutes on both sides
+    :param sec_times: 1-minute section run times
+    :return: {sta: (lo, hi)}
+    '''
+    probe = Train(row[0], 0, 0)
+    probe.linePlan = row[5]
+    probe.init_traStaList(ms.station_list)
+    offsets = probe.earliest_offsets(sec_times)
+    t_dep = coarse_times[probe.v_staList[1]] * factor
+    return {sta: (t_dep + offset - width, coarse_times[sta] * factor + factor - 1 + width)
+            for sta, offset in offsets.items()}
+
+
+def multi_resolution(rows, factor=5, width=None, min_gap=0.1, max_iter=None, coarse_max_iter=None):
+    '''
+    :param rows: read_train_rows rows, station_list / v_station_list / sec_times / time_span of main_slim must be set
+    :param factor: minutes per coarse step
+    :param width: corridor half width in minutes, factor by default
+    :param min_gap: target gap of both levels
+    :param max_iter: iteration cap of the fine level
+    :param coarse_max_iter: iteration cap of the coarse level
+    :return: LB, UB, gap of the fine level, the fine network stays in the main_slim globals
+    '''
+    width = factor if width is None else width
+    fine_span, fine_sec_times = ms.time_span, ms.sec_times
+
+    # 粗网格
+    ms.time_span = -(-fine_span // factor)
+    ms.sec_times = coarse_sec_times(fine_sec_times, factor)
+    ms.train_list = [ms.create_train(*row, time_scale=factor) for row in rows]
+    if ms.arc_store is not None:
+        ms.arc_store.freeze()
+    ms.incidence = ms.build_network()
+    ms.arc_choice = ArcChoice(ms.incidence)
+    n_coarse_arcs = len(ms.incidence.arcs)
+    LB, UB, gap = ms.lagrangian_relaxation(min_gap, coarse_max_iter)
+    logger.info(f"coarse level: {n_coarse_arcs} arcs, {len(LB)} iterations, gap {gap}")
+    coarse = [solution_times(train) for train in ms.train_list]
+    ms.release_network()
+
+    # 在走廊内细化到1分钟
+    ms.time_span = fine_span
+    ms.sec_times = fine_sec_times
+    ms.train_list = [ms.create_train(*row, corridor=corridor_of(row, times, factor, width, fine_sec_times)
+                                     if times is not None else None) for row, times in zip(rows, coarse)]
+    if ms.arc_store is not None:
+        ms.arc_store.freeze()
+    ms.incidence = ms.build_network()
+    ms.arc_choice = ArcChoice(ms.incidence)
+    LB, UB, gap = ms.lagrangian_relaxation(min_gap, max_iter)
+    logger.info(f"fine level: {len(ms.incidence.arcs)} arcs, {len(LB)} iterations, gap {gap}")
+    return LB, UB, gap
+
+
+if __name__ == '__main__':
+    station_size = int(os.environ.get('station_size', 30))
+    train_size = int(os.environ.get('train_size', 5))
+    ms.time_span = int(os.environ.get('time_span', 500))
+    time_scale = int(os.environ.get('time_scale', 5))
+    corridor_width = int(os.environ.get('corridor_width', time_scale))
+    if int(os.environ.get('arc_store', 0)):
+        ms.arc_store = ArcStore()
+    if int(os.environ.get('arc_templates', 0)):
+        ms.arc_templates = {}
+    ms.read_station('raw_data/1-station.xlsx', station_size)
+    ms.read_section('raw_data/3-section-time.xlsx')
+    rows = ms.read_train_rows('raw_data/6-lineplan-down.xlsx', train_size)
+    LB, UB, gap = multi_resolution(rows, time_scale, corridor_width)
+    ms.get_train_timetable_from_result()
+    print("================== solution found ==================")
+    print("                 final gap: " + str(round(gap * 100, 5)) + "% \n")
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# 乘子更新策略：每轮LR后根据当前点的对偶值（LR下界）和次梯度移动乘子，投影到非负
+# 可选: diminishing（原来的 0.5/(iter+1) 步长）、polyak（用最好的上界估计步长）、
+#       deflected（偏转/共轭次梯度方向）、bundle（近端束方法，束聚合为一条）
+import math
+
+import numpy as np
+
+
+class DiminishingStep():
+    '''
+    alpha = a / (iter + 1), fixed at a / cap from iteration cap on
+    '''
+    def __init__(self, a=0.5, cap=20):
+        self.a = a
+        self.cap = cap
+
+    def update(self, multiplier, subgradient, dual_value, best_UB, iter):
+        '''
+        move multiplier in place
+        :param multiplier: multiplier array
+        :param subgradient: subgradient at multiplier, same shape
+        :param dual_value: Lagrangian dual value at multiplier
+        :param best_UB: best feasible solution cost so far, inf if none
+        :param iter: iteration number from 0
+        :return:
+        '''
+        alpha = self.a / (iter + 1) if iter < self.cap else self.a / self.cap
+        np.maximum(0, multiplier + alpha * subgradient, out=multiplier)
+
+
+def _target(best_UB, best_dual):
+    # 没有可行解时用最好下界放大一点作为目标值
+    if math.isfinite(best_UB):
+        return best_UB
+    return best_dual + abs(best_dual) * 0.1 + 1
+
+
+def _projected(multiplier, direction):
+    '''
+    direction with the components that would push a zero multiplier below zero removed
+    '''
+    return np.where((multiplier <= 0) & (direction < 0), 0, direction)
+
+
+class PolyakStep():
+    '''
+    alpha = theta * (UB - dual) / ||g||^2, theta halved after patience iterations without a better dual value
+    '''
+    def __init__(self, theta=1.0, patience=5, min_theta=1e-4):
+        self.theta = theta
+        self.patience = patience
+        self.min_theta = min_theta
+        self.best_dual = -math.inf
+        self.stall = 0
+
+    def _track(self, dual_value):
+        if dual_value > self.best_dual:
+            self.best_dual = dual_value
+            self.stall = 0
+        else:
+            self.stall += 1
+            if self.stall >= self.patience:
+                self.theta = max(self.theta / 2, self.min_theta)
+                self.stall = 0
+
+    def update(self, multiplier, subgradient, dual_value, best_UB, iter):
+        self._track(dual_value)
+        direction = _projected(multiplier, subgradient)
+        norm2 = float((direction * direction).sum())
+        if norm2 == 0:  # 当前解已满足所有松弛约束
+            return
+        alpha = self.theta * max(_target(best_UB, self.best_dual) - dual_value, 0) / norm2
+        np.maximum(0, multiplier + alpha * direction, out=multiplier)
+
+
+class DeflectedSubgradient(PolyakStep):
+    '''
+    direction d = g + beta * d_prev with the Camerini-Fratta-Maffioli deflection
+    beta = -gamma * g.d_prev / ||d_prev||^2 when g and d_prev form an obtuse angle, Polyak step along d
+    '''
+    def __init__(self, gamma=1.5, **kwargs):
+        super().__init__(**kwargs)
+        self.gamma = gamma
+        self.direction = None
+
+    def update(self, multiplier, subgradient, dual_value, best_UB, iter):
+        self._track(dual_value)
+        direction = _projected(multiplier, subgradient)
+        if self.direction is not None:
+            inner = float((direction * self.direction).sum())
+            prev_norm2 = float((self.direction * self.direction).sum())
+            if inner < 0 and prev_norm2 > 0:  # 与上一方向成钝角时偏转，减少锯齿
+                direction = direction - self.gamma * inner / prev_norm2 * self.direction
+        norm2 = float((direction * direction).sum())
+        if norm2 == 0:
+            return
+        self.direction = direction
+        alpha = self.theta * max(_target(best_UB, self.best_dual) - dual_value, 0) / norm2
+        np.maximum(0, multiplier + alpha * direction, out=multiplier)
+
+
+class ProximalBundle():
+    '''
+    proximal bundle method for the concave dual, with the bundle aggregated into one cut so the master problem
+    (choose the convex combination of the aggregate and the newest cut) has a closed form.
+    A trial point becomes the new stability center (serious step) if its dual value achieves at least m times
+    the predicted increase, otherwise the cut only enriches the model (null step)
+    '''
+    def __init__(self, t=1.0, m=0.1, t_min=1e-3, t_max=1e3):
+        self.t = t  # 近端参数，步长
+        self.m = m
+        self.t_min = t_min
+        self.t_max = t_max
+        self.center = None
+        self.center_value = None
+        self.predicted = None
+        self.aggregate = None  # 聚合次梯度
+        self.aggregate_error = 0.0  # 聚合割平面在中心处的线性化误差
+
+    def update(self, multiplier, subgradient, dual_value, best_UB, iter):
+        g = subgradient.ravel()
+        x = multiplier.ravel()
+        if self.center is None:
+            self.center = x.copy()
+            self.center_value = dual_value
+            error = 0.0
+        else:
+            # 新割平面在中心处的线性化误差: L_x(center) - L(center) >= 0
+            error = max(dual_value + float(g @ (self.center - x)) - self.center_value, 0.0)
+            if dual_value >= self.center_value + self.m * self.predicted:  # serious step
+                shift = float(g @ (x - self.center))
+                self.aggregate_error = max(self.aggregate_error + self.center_value - dual_value
+                                           + float(self.aggregate @ (x - self.center)), 0.0)
+                error = max(error + self.center_value - dual_value + shift, 0.0)
+                self.center = x.copy()
+                self.center_value = dual_value
+                self.t = min(self.t * 2, self.t_max)
+            else:  # null step
+                self.t = max(self.t / 2, self.t_min)
+
+        # 主问题: min_{lam in [0,1]} t/2 ||lam g + (1-lam) agg||^2 + lam e + (1-lam) agg_e
+        if self.aggregate is None:
+            lam = 1.0
+        else:
+            diff = g - self.aggregate
+            norm2 = float(diff @ diff)
+            if norm2 == 0:
+                lam = 1.0 if error <= self.aggregate_error else 0.0
+            else:
+                lam = -(self.t * float(self.aggregate @ diff) + error - self.aggregate_error) / (self.t * norm2)
+                lam = min(max(lam, 0.0), 1.0)
+            g = lam * g + (1 - lam) * self.aggregate
+            error = lam * error + (1 - lam) * self.aggregate_error
+        self.aggregate = g
+        self.aggregate_error = error
+        self.predicted = self.t * float(g @ g) + error  # 模型预测的上升量
+        np.maximum(0, self.center + self.t * g, out=x)
+        multiplier[...] = x.reshape(multiplier.shape)
+
+
+STRATEGIES = {
+    'diminishing': DiminishingStep,
+    'polyak': PolyakStep,
+    'deflected': DeflectedSubgradient,
+    'bundle': ProximalBundle,
+}
+
+
+def make_strategy(name='diminishing', **kwargs):
+    '''
+    :param name: one of STRATEGIES
+    :param kwargs: passed to the strategy class
+    :return: strategy object with update(multiplier, subgradient, dual_value, best_UB, iter)
+    '''
+    if name not in STRATEGIES:
+        raise ValueError(f"unknown multiplier update strategy: {name}")
+    return STRATEGIES[name](**kwargs)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# 建好的时空网络（列存储的弧、弧-节点关联矩阵、车站/区间/列车信息）存成 .npz，
+# 以输入文件内容和规模参数的哈希为key，同一开行方案再次运行时直接读入，跳过读Excel和建网
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from Arc import ArcStore
+from incidence import ArcNodeIncidence
+from Train import Train
+
+FORMAT_VERSION = 2  # 存储格式有变化时加1，旧缓存自动失效
+TRAIN_FIELDS = ('preferred_time', 'up', 'standard', 'speed')  # 除开行方案外需要保存的列车属性
+
+
+def cache_key(paths, **params):
+    '''
+    hash of the input files' content and the build parameters
+    :param paths: input files
+    :param params: e.g. time_span, station_size, train_size, and the build flags (arc_templates, prune) that change
+                   the saved network
+    :return: hex digest
+    '''
+    h = hashlib.sha1()
+    h.update(str(FORMAT_VERSION).encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, 'network_' + key + '.npz')
+
+
+def _plain(value):
+    # numpy / pandas 标量转为可 json 序列化的值
+    if hasattr(value, 'item'):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def save_network(path, station_list, v_station_list, miles, sec_times, train_list, incidence):
+    '''
+    :param path: .npz file
+    :param incidence: ArcNodeIncidence built from the ArcStore holding the arcs of train_list
+    :return:
+    '''
+    store = incidence.arcs
+    meta = {
+        'station_list': list(station_list),
+        'v_station_list': list(v_station_list),
+        'miles': [_plain(m) for m in miles],
+        'sec_times': [[a, b, _plain(v)] for (a, b), v in sec_times.items()],
+        'trains': [dict({'traNo': train.traNo, 'dep_LB': train.dep_LB, 'dep_UB': train.dep_UB,
+                         'linePlan': {sta: _plain(v) for sta, v in train.linePlan.items()}},
+                        **{name: _plain(getattr(train, name, None)) for name in TRAIN_FIELDS})
+                   for train in train_list],
+        'train_names': store.train_names,
+        'station_names': store.station_names,
+        'time_span': incidence.time_span,
+    }
+    arrays = {'col_' + name: getattr(store, name) for name in ArcStore.columns}
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, meta=np.array(json.dumps(meta)), train_ranges=np.array(store.train_ranges, dtype=np.int64),
+             arc_length=incidence.arc_length, occ_lo=incidence.occ_lo, occ_hi=incidence.occ_hi, **arrays)
+    os.replace(tmp_path, path)  # 写完再改名，中途中断不会留下损坏的缓存
+
+
+def load_network(path):
+    '''
+    :param path: .npz file written by save_network
+    :return: station_list, v_station_list, miles, sec_times, train_list, arc_store, incidence
+    '''
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        store = ArcStore.from_columns({name: data['col_' + name] for name in ArcStore.columns},
+                                      meta['train_names'], meta['station_names'], data['train_ranges'].tolist())
+        time_span = meta['time_span']
+        incidence = ArcNodeIncidence(meta['v_station_list'][1:-1], time_span).load(store, data['arc_length'],
+                                                                                  data['occ_lo'], data['occ_hi'])
+    sec_times = {(a, b): v for a, b, v in meta['sec_times']}
+    train_list = []
+    for store_id, info in enumerate(meta['trains']):
+        train = Train(info['traNo'], info['dep_LB'], info['dep_UB'])
+        for name in TRAIN_FIELDS:
+            setattr(train, name, info[name])
+        train.linePlan = info['linePlan']
+        train.init_traStaList(meta['station_list'])
+        template = store.train_template[store_id]  # 共用弧的列车在前面
+        train.attach_arc_store(sec_times, time_span, store, store_id,
+                               train_list[template] if template != store_id else None)
+        train_list.append(train)
+    return meta['station_list'], meta['v_station_list'], np.array(meta['miles']), sec_times, train_list, store, \
+        incidence
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# LR中各列车子问题在给定乘子下相互独立，按列车分组放到多个进程中并行求解
+# 每个进程常驻一份自己负责列车的网络（只含DP所需的信息），每轮只传乘子出去、传路径和费用回来
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from incidence import interval_sums
+from shortest_path import dag_shortest_path
+
+PricingArc = collections.namedtuple('PricingArc', ['timeBelong_next', 'arc_length', 'index'])
+
+
+class PricingNetwork():
+    def __init__(self, train, local_index):
+        '''
+        picklable copy of a train time-space network, arcs renumbered by local_index
+        :param train:
+        :param local_index: dict, arc.index => index inside the worker
+        '''
+        self.traNo = train.traNo
+        self.v_staList = list(train.v_staList)
+        self.arcs = {}  # 与 Train.arcs 相同的三层字典: dep-arr => t => span
+        for sec, cur_arcs in train.arcs.items():
+            self.arcs[sec] = {}
+            for t, arcs_t in cur_arcs.items():
+                self.arcs[sec][t] = {}
+                for span, arc in arcs_t.items():
+                    self.arcs[sec][t][span] = PricingArc(arc.timeBelong_next, arc.arc_length, local_index[arc.index])
+
+
+# worker进程内的常驻数据
+_worker = {}
+
+
+def _init_worker(networks, arc_length, occ_lo, occ_hi, org, des):
+    _worker['networks'] = networks
+    _worker['arc_length'] = arc_length
+    _worker['occ_lo'] = occ_lo
+    _worker['occ_hi'] = occ_hi
+    _worker['org'] = org
+    _worker['des'] = des
+
+
+def _solve(multiplier):
+    arc_costs = (_worker['arc_length'] + interval_sums(multiplier, _worker['occ_lo'], _worker['occ_hi'])).tolist()
+    return [dag_shortest_path(_worker['org'], _worker['des'], network, arc_costs=arc_costs)
+            for network in _worker['networks']]
+
+
+class ParallelPricing():
+    def __init__(self, train_list, incidence, n_workers, org=('s_', -1), des=('_t', -1)):
+        '''
+        :param train_list:
+        :param incidence: ArcNodeIncidence built on train_list
+        :param n_workers: number of worker processes
+        :param org: source node name [sta, t]
+        :param des: sink node name [sta, t]
+        '''
+        self.n_trains = len(train_list)
+        self.n_workers = max(1, min(n_workers, self.n_trains))
+        # 列车按顺序轮流分配给各进程，分配固定，结果按列车顺序拼回，保证可复现
+        self.train_ids = [list(range(w, self.n_trains, self.n_workers)) for w in range(self.n_workers)]
+        # 每个进程一个单进程的 executor，这样各进程的常驻网络是确定的
+        self.executors = []
+        for ids in self.train_ids:
+            global_index = [arc.index for i in ids for arcs_sec in train_list[i].arcs.values()
+                            for arcs_t in arcs_sec.values() for arc in arcs_t.values()]
+            local_index = {g: l for l, g in enumerate(global_index)}
+            networks = [PricingNetwork(train_list[i], local_index) for i in ids]
+            global_index = np.array(global_index, dtype=np.int64)
+            executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                           initargs=(networks, incidence.arc_length[global_index],
+                                                     incidence.occ_lo[global_index], incidence.occ_hi[global_index],
+                                                     org, des))
+            self.executors.append(executor)
+
+    def solve(self, multiplier):
+        '''
+        solve all train sub-problems under the given multipliers
+        :param multiplier: multiplier array, shape (stations, time_span)
+        :return: list of (node_passed, cost), ordered as train_list
+        '''
+        multiplier = np.ascontiguousarray(multiplier).ravel()
+        futures = [executor.submit(_solve, multiplier) for executor in self.executors]
+        solutions = [None] * self.n_trains
+        for ids, future in zip(self.train_ids, futures):
+            for i, solution in zip(ids, future.result()):
+                solutions[i] = solution
+        return solutions
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown()
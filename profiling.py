@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# 运行过程的埋点：各阶段/各轮迭代的计时、计数器（如最短路中扩展的弧数、生成的标号数）和 tracemalloc 内存，
+# 结果导出为 JSONL 或 Chrome trace（chrome://tracing、Perfetto 可直接打开）
+import functools
+import json
+import os
+import time
+import tracemalloc
+from collections import defaultdict
+
+
+class Profiler():
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.events = []  # 已结束的阶段
+        self.counters = defaultdict(int)
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    def enable(self, trace_memory=True):
+        self.enabled = True
+        self._origin = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.trace_memory = True
+
+    def disable(self):
+        self.enabled = False
+        if self.trace_memory:
+            tracemalloc.stop()
+            self.trace_memory = False
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def phase(self, name, **args):
+        '''
+        context manager timing a phase, extra keyword args (e.g. iteration) are stored with the event
+        '''
+        return _Phase(self, name, args)
+
+    def timed(self, name=None):
+        '''
+        decorator timing every call of a function as a phase
+        '''
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.phase(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def memory_peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+
+    def summary(self):
+        totals = defaultdict(float)
+        for event in self.events:
+            totals[event['name']] += event['duration']
+        return {'phase_totals': dict(totals), 'counters': dict(self.counters), 'memory_peak': self.memory_peak()}
+
+    def dump(self, path):
+        '''
+        write the trace, as a Chrome trace if path ends with .json, otherwise as JSONL
+        '''
+        if path.endswith('.json'):
+            self.dump_chrome_trace(path)
+        else:
+            self.dump_jsonl(path)
+
+    def dump_jsonl(self, path):
+        with open(path, 'w') as f:
+            for event in self.events:
+                f.write(json.dumps(dict(event, type='phase')) + '\n')
+            f.write(json.dumps(dict(self.summary(), type='summary')) + '\n')
+
+    def dump_chrome_trace(self, path):
+        trace_events = []
+        for event in self.events:
+            args = dict(event['args'])
+            args.update(event['counters'])
+            if event['memory'] is not None:
+                args['memory'] = event['memory']
+            trace_events.append({'name': event['name'], 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                                 'ts': event['start'] * 1e6, 'dur': event['duration'] * 1e6, 'args': args})
+            if event['memory'] is not None:
+                trace_events.append({'name': 'memory', 'ph': 'C', 'pid': os.getpid(), 'tid': 0,
+                                     'ts': (event['start'] + event['duration']) * 1e6,
+                                     'args': {'current': event['memory'], 'peak': event['memory_peak']}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'otherData': self.summary()}, f)
+
+
+class _Phase():
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.counters = dict(self.profiler.counters)
+            self.depth = self.profiler._depth
+            self.profiler._depth += 1
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        if not profiler.enabled or not hasattr(self, 'start'):
+            return False
+        end = time.perf_counter()
+        profiler._depth -= 1
+        memory, memory_peak = tracemalloc.get_traced_memory() if profiler.trace_memory else (None, None)
+        counters = {name: n - self.counters.get(name, 0) for name, n in profiler.counters.items()
+                    if n != self.counters.get(name, 0)}  # 该阶段内各计数器的增量
+        profiler.events.append({'name': self.name, 'start': self.start - profiler._origin,
+                                'duration': end - self.start, 'depth': self.depth, 'args': self.args,
+                                'counters': counters, 'memory': memory, 'memory_peak': memory_peak})
+        return False
+
+
+profiler = Profiler()  # 全局默认实例，默认关闭
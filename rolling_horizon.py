@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# 滚动时域排图：整个时域切成相互重叠的窗口依次求解，每个窗口只排始发时间落在其前 step 分钟内的列车，
+# 窗口其余部分留给这些列车跑完全程；已排好的列车在后续窗口中以占用节点（frozen_nodes）的形式固定，
+# 上一个窗口的网络在求解下一个窗口前全部释放，内存只与窗口长度有关
+# usage: window=300 step=120 horizon=1440 python rolling_horizon.py
+import logging
+import math
+import os
+
+import main_slim as ms
+from Arc import ArcStore
+from incidence import ArcChoice
+
+logger = logging.getLogger("railway")
+
+
+def departure_of(row):
+    '''
+    preferred departure time of a read_train_rows row, 0 if missing
+    '''
+    try:
+        t = float(row[1])
+    except (TypeError, ValueError):
+        return 0
+    return 0 if math.isnan(t) else t
+
+
+def solve_window(rows, start, window, step, frozen, min_gap=0.1, max_iter=50):
+    '''
+    schedule the trains of one window with the nodes in frozen kept occupied
+    :param rows: read_train_rows rows of the trains departing in [start, start + step)
+    :param start: window start, absolute time
+    :param window: window length
+    :param step: length of the departure slot, trains depart in [start, start + step)
+    :param frozen: (sta, t) nodes occupied by trains of earlier windows, absolute time
+    :return: timetables {traNo: {v_sta: t}} in absolute time, nodes occupied by these trains in absolute time
+    '''
+    ms.time_span = window
+    ms.train_list = [ms.create_train(*row, dep_LB=0, dep_UB=step) for row in rows]
+    if ms.arc_store is not None:
+        ms.arc_store.freeze()
+    ms.incidence = ms.build_network()
+    ms.arc_choice = ArcChoice(ms.incidence)
+    ms.frozen_nodes = [(sta, t - start) for sta, t in frozen if start <= t < start + window]
+    ms.occupy_frozen_nodes()
+    LB, UB, gap = ms.lagrangian_relaxation(min_gap, max_iter)
+    logger.info(f"window {start}-{start + window}: {len(rows)} trains, {len(LB)} iterations, gap {gap}")
+
+    timetables = {}
+    occupied = []
+    for train in ms.train_list:
+        if train.feasible_path is None or train.feasible_path.node_passed is None:  # 该窗口内排不下
+            continue
+        timetables[train.traNo] = {sta: t + start for sta, t in train.feasible_path.node_passed[1:-1]}
+        for arc_index in train.last_feasible_arcs:
+            occupied.extend((sta, t + start) for sta, t in ms.incidence.occupied_nodes(arc_index))
+    return timetables, occupied
+
+
+def rolling_horizon(rows, horizon, window, step, min_gap=0.1, max_iter=50):
+    '''
+    :param rows: read_train_rows rows, station_list / v_station_list / sec_times of main_slim must be read already
+    :param horizon: total time span, e.g. 1440 for one day
+    :param window: window length, at least step plus the longest running time
+    :param step: distance between window starts, window - step is the overlap
+    :return: timetables {traNo: {v_sta: t}} in absolute time, traNo of the trains that could not be scheduled
+    '''
+    timetables = {}
+    unscheduled = []
+    frozen = []
+    for start in range(0, horizon, step):
+        # 时域之外的始发时间归入首/末窗口
+        rows_k = [row for row in rows if start <= min(max(departure_of(row), 0), horizon - 1) < start + step]
+        if not rows_k:
+            continue
+        timetables_k, occupied = solve_window(rows_k, start, window, step, frozen, min_gap, max_iter)
+        unscheduled.extend(row[0] for row in rows_k if row[0] not in timetables_k)
+        timetables.update(timetables_k)
+        # 只保留之后窗口还会用到的占用
+        frozen = [(sta, t) for sta, t in frozen + occupied if t >= start + step]
+        ms.release_network()
+    return timetables, unscheduled
+
+
+if __name__ == '__main__':
+    station_size = int(os.environ.get('station_size', 30))
+    train_size = int(os.environ.get('train_size', 5))
+    horizon = int(os.environ.get('horizon', 1440))
+    window = int(os.environ.get('window', 300))
+    step = int(os.environ.get('step', 120))
+    max_iter = int(os.environ.get('max_iter', 50))
+    if int(os.environ.get('arc_store', 0)):
+        ms.arc_store = ArcStore()
+    if int(os.environ.get('arc_templates', 0)):
+        ms.arc_templates = {}
+    ms.read_station('raw_data/1-station.xlsx', station_size)
+    ms.read_section('raw_data/3-section-time.xlsx')
+    rows = ms.read_train_rows('raw_data/6-lineplan-down.xlsx', train_size)
+    timetables, unscheduled = rolling_horizon(rows, horizon, window, step, max_iter=max_iter)
+    for traNo, timetable in timetables.items():
+        print("===============Tra_" + traNo + "======================")
+        print(timetable)
+    if unscheduled:
+        print("unscheduled trains: " + ", ".join(unscheduled))
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# 列车时空网络上的最短路：网络按 v_staList 分层、层内按时间展开，是一个DAG，
+# 按拓扑序做一次 reaching（Bellman）即可，复杂度 O(arcs)
+import numpy as np
+
+from profiling import profiler
+
+
+def dag_shortest_path(org, des, train, arc_costs, forbidden=False, labels=None, start_layer=0, occupation=None):
+    '''
+    topologically ordered DP on the train time-space network, with predecessor pointers
+    :param org: source node name [sta, t]
+    :param des: sink node name [sta, t]
+    :param train: train to generate train time space network
+    :param arc_costs: flat cost array indexed by arc.index (see ArcNodeIncidence.reduced_costs), the multipliers
+                      live only in the multiplier array, so there is no per-arc fallback
+    :param forbidden: skip arcs whose head node is occupied in occupation (feasible solution phase)
+    :param labels: [dist, pred] kept between calls on the same train and updated in place, dist[i] / pred[i] are
+                   the labels of layer v_staList[i] keyed by t
+    :param start_layer: with labels of a previous call, layers up to start_layer keep their labels and arcs are
+                        relaxed from this layer on (warm start)
+    :param occupation: NodeOccupation, required with forbidden
+    :return: node_passed (list of node names [sta, t] from source to sink), cost; (None, inf) if sink unreachable
+    '''
+    if forbidden and occupation is None:
+        raise ValueError("forbidden shortest path needs the NodeOccupation of the feasible solution")
+    if labels is None:
+        labels = [[], []]
+    dist, pred = labels  # 到达各层各时刻节点的最短距离，以及前驱节点的时刻
+    if len(dist) == 0 or start_layer <= 0:
+        start_layer = 0
+        dist[:] = [{org[1]: 0}]
+        pred[:] = [{}]
+    else:  # 之前各层的标号不受影响，保留
+        start_layer = min(start_layer, len(dist) - 1)
+        del dist[start_layer + 1:]
+        del pred[start_layer + 1:]
+    while len(dist) < len(train.v_staList):
+        dist.append({})
+        pred.append({})
+
+    blocked = None  # 该列车各弧的头节点是否已被占用，以 arc.index - arc_lo 为下标
+    arc_lo = 0
+    if forbidden:
+        arc_lo, arc_hi = _arc_range(train)
+        blocked = occupation.blocked(arc_lo, arc_hi)
+
+    # 层 v_staList[i] 的弧只流向层 v_staList[i + 1]，逐层推进即为拓扑序
+    if getattr(train, 'arc_store', None) is not None:
+        _relax_stored_arcs(train, dist, pred, start_layer, arc_costs, blocked, arc_lo)
+    else:
+        if blocked is not None:
+            blocked = blocked.tolist()
+        _relax_arcs(train, dist, pred, start_layer, arc_costs, blocked, arc_lo)
+
+    if des[1] not in dist[-1]:
+        return None, float('inf')
+    # 沿前驱指针回溯路径
+    node_passed = []
+    t = des[1]
+    for i in range(len(train.v_staList) - 1, 0, -1):
+        node_passed.append([train.v_staList[i], t])
+        t = pred[i][t]
+    node_passed.append([train.v_staList[0], t])
+    node_passed.reverse()
+    return node_passed, dist[-1][des[1]]
+
+
+def _arc_range(train):
+    if getattr(train, 'arc_store', None) is not None:
+        return train.arc_store.train_ranges[train.store_id]
+    return train.arc_range
+
+
+def _relax_arcs(train, dist, pred, start_layer, arc_costs, blocked=None, arc_lo=0):
+    n_relaxed = 0  # 扩展的弧数
+    n_labels = 0  # 生成/更新的标号数
+    for i in range(start_layer, len(train.v_staList) - 1):
+        dep = train.v_staList[i]
+        arr = train.v_staList[i + 1]
+        dist_dep = dist[i]
+        dist_arr = dist[i + 1]
+        pred_arr = pred[i + 1]
+        for t, arcs_t in train.arcs[dep, arr].items():
+            if t not in dist_dep:  # 该点不可达
+                continue
+            dist_tail = dist_dep[t]
+            n_relaxed += len(arcs_t)
+            for arc in arcs_t.values():
+                head_t = arc.timeBelong_next
+                if blocked is not None and blocked[arc.index - arc_lo]:  # 若下一节点已经被占用
+                    continue
+                dist_head = dist_tail + arc_costs[arc.index]
+                if head_t not in dist_arr or dist_head < dist_arr[head_t]:
+                    dist_arr[head_t] = dist_head
+                    pred_arr[head_t] = t
+                    n_labels += 1
+    profiler.count('arcs_relaxed', n_relaxed)
+    profiler.count('labels_generated', n_labels)
+
+
+def _relax_stored_arcs(train, dist, pred, start_layer, arc_costs, blocked=None, arc_lo=0):
+    '''
+    the same relaxation for a train whose arcs live in an ArcStore, run straight over the store columns
+    (arcs of a train are stored layer by layer, so store order is a topological order);
+    with blocked the arcs into occupied nodes are masked out up front
+    '''
+    store = train.arc_store
+    lo = store.find(train.store_id, start_layer, -1)[0]
+    hi = store.train_ranges[train.store_id][1]
+    n_relaxed = 0
+    n_labels = 0
+    if blocked is not None:
+        arc_ids = lo + np.flatnonzero(~blocked[lo - arc_lo:hi - arc_lo])
+        columns = zip(arc_ids.tolist(), store.layer[arc_ids].tolist(), store.tail_t[arc_ids].tolist(),
+                      store.head_t[arc_ids].tolist())
+    else:
+        columns = zip(range(lo, hi), store.layer[lo:hi].tolist(), store.tail_t[lo:hi].tolist(),
+                      store.head_t[lo:hi].tolist())
+    for i, layer, tail_t, head_t in columns:
+        if tail_t not in dist[layer]:
+            continue
+        n_relaxed += 1
+        dist_head = dist[layer][tail_t] + arc_costs[i]
+        dist_arr = dist[layer + 1]
+        if head_t not in dist_arr or dist_head < dist_arr[head_t]:
+            dist_arr[head_t] = dist_head
+            pred[layer + 1][head_t] = tail_t
+            n_labels += 1
+    profiler.count('arcs_relaxed', n_relaxed)
+    profiler.count('labels_generated', n_labels)
+
+
+class WarmStartPricing():
+    '''
+    LR pricing that keeps each train's DP labels between iterations. Multipliers are compared with the values the
+    labels were computed with and only moves beyond tolerance are taken in; a train is re-propagated from the first
+    layer holding an arc on a changed node, and skipped if it has none.
+    With tolerance > 0 the solutions are optimal for self.reference, not for the current multipliers, so the
+    Lagrangian bound of an iteration is sum(costs) - reference.sum(); the current multipliers give no valid bound
+    '''
+    def __init__(self, train_list, incidence, tolerance=0.0, org=('s_', -1), des=('_t', -1)):
+        '''
+        :param train_list:
+        :param incidence: ArcNodeIncidence built on train_list
+        :param tolerance: multiplier moves up to tolerance are ignored, 0 gives the exact LR solution
+        :param org: source node name [sta, t]
+        :param des: sink node name [sta, t]
+        '''
+        self.train_list = train_list
+        self.incidence = incidence
+        self.tolerance = tolerance
+        self.org = org
+        self.des = des
+        self.reference = None  # 当前标号所用的乘子（展平），solve 返回的解对它是精确最优的
+        self.labels = [None] * len(train_list)
+        self.solutions = [None] * len(train_list)
+        self.n_layers = max(len(train.v_staList) for train in train_list) if train_list else 0
+        # 各弧所属的列车和层
+        self.arc_train = np.zeros(len(incidence.arcs), dtype=np.int64)
+        self.arc_layer = np.zeros(len(incidence.arcs), dtype=np.int64)
+        # 共用弧的列车（train.template）子问题相同，跟随 template 重算
+        self.template_id = list(range(len(train_list)))
+        train_id_of = {id(train): train_id for train_id, train in enumerate(train_list)}
+        for train_id, train in enumerate(train_list):
+            template = getattr(train, 'template', None)
+            if template is not None and id(template) in train_id_of:
+                self.template_id[train_id] = train_id_of[id(template)]
+                continue
+            for layer in range(len(train.v_staList) - 1):
+                for arcs_t in train.arcs[train.v_staList[layer], train.v_staList[layer + 1]].values():
+                    for arc in arcs_t.values():
+                        self.arc_train[arc.index] = train_id
+                        self.arc_layer[arc.index] = layer
+
+    def solve(self, multiplier):
+        '''
+        :param multiplier: multiplier array, shape (stations, time_span)
+        :return: list of (node_passed, cost), ordered as train_list
+        '''
+        multiplier = multiplier.ravel()
+        if self.reference is None:
+            self.reference = multiplier.copy()
+            changed_nodes = np.ones(len(multiplier), dtype=bool)
+        else:
+            changed_nodes = np.abs(multiplier - self.reference) > self.tolerance
+            self.reference[changed_nodes] = multiplier[changed_nodes]
+        arc_costs = self.incidence.reduced_costs(self.reference).tolist()
+        changed_arcs = np.flatnonzero(self.incidence.arcs_on_nodes(changed_nodes))
+        start_layer = np.full(len(self.train_list), self.n_layers)  # n_layers 表示该列车网络没有变化
+        np.minimum.at(start_layer, self.arc_train[changed_arcs], self.arc_layer[changed_arcs])
+        start_layer = start_layer[self.template_id]
+        for train_id, train in enumerate(self.train_list):
+            if self.labels[train_id] is None:
+                self.labels[train_id] = [[], []]
+            elif start_layer[train_id] == self.n_layers:  # 沿用上一轮的解
+                continue
+            self.solutions[train_id] = dag_shortest_path(self.org, self.des, train, arc_costs=arc_costs,
+                                                         labels=self.labels[train_id],
+                                                         start_layer=int(start_layer[train_id]))
+        return list(self.solutions)
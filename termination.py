@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# LR循环的终止控制：目标间隙、最大迭代数、时间预算、下界长时间无改进，记录迄今最好的上下界
+import math
+import time
+
+
+class Termination():
+    def __init__(self, min_gap=0.1, max_iter=None, time_limit=None, patience=None, eps=1e-6):
+        '''
+        :param min_gap: stop when (best UB - best LB) / best LB drops to min_gap
+        :param max_iter: iteration budget, None for no limit
+        :param time_limit: wall clock budget in seconds, None for no limit
+        :param patience: stop after this many iterations without a better LB or UB, None for no limit
+        :param eps: a best LB within eps of 0 gives no relative gap, only UB - LB <= eps counts as converged
+        '''
+        self.min_gap = min_gap
+        self.max_iter = max_iter
+        self.time_limit = time_limit
+        self.patience = patience
+        self.eps = eps
+        self.start_time = time.time()
+        self.best_LB = -math.inf
+        self.best_UB = math.inf
+        self.best_UB_iter = None
+        self.iter = 0
+        self.stall = 0
+        self.reason = None
+
+    def update(self, LB, UB):
+        '''
+        record the bounds of one iteration
+        :return: whether UB is a new best, so the caller can keep the solution
+        '''
+        improved = False
+        if LB > self.best_LB + self.eps:
+            self.best_LB = LB
+            improved = True
+        better_UB = UB < self.best_UB - self.eps
+        if better_UB:
+            self.best_UB = UB
+            self.best_UB_iter = self.iter
+            improved = True
+        self.stall = 0 if improved else self.stall + 1
+        self.iter += 1
+        return better_UB
+
+    def gap(self):
+        if not math.isfinite(self.best_UB) or not math.isfinite(self.best_LB):
+            return math.inf
+        if self.best_UB - self.best_LB <= self.eps:
+            return 0.0
+        if abs(self.best_LB) <= self.eps:  # 下界接近0时相对间隙没有意义
+            return math.inf
+        return (self.best_UB - self.best_LB) / abs(self.best_LB)
+
+    def should_stop(self):
+        '''
+        :return: True when a criterion is met, the criterion is left in self.reason
+        '''
+        if self.iter > 0 and self.gap() <= self.min_gap:
+            self.reason = 'gap'
+        elif self.max_iter is not None and self.iter >= self.max_iter:
+            self.reason = 'max_iter'
+        elif self.time_limit is not None and time.time() - self.start_time >= self.time_limit:
+            self.reason = 'time_limit'
+        elif self.patience is not None and self.stall >= self.patience:
+            self.reason = 'patience'
+        return self.reason is not None
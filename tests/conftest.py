@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# 测试共用：在 main_slim 的模块全局上构造一个小的合成算例（随机区间运行时分，几种停站方案轮流分配给各列车）
+import importlib
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main_slim  # noqa: E402
+from Arc import ArcStore  # noqa: E402
+from incidence import ArcChoice  # noqa: E402
+
+
+def build_instance(n_stations=6, n_trains=12, time_span=100, n_patterns=3, store=True, templates=True, seed=5):
+    '''
+    :param store: arcs in an ArcStore instead of Arc objects
+    :param templates: trains with the same stop pattern share their arcs (see Train.share_arcs)
+    :return: freshly reloaded main_slim with train_list, incidence and arc_choice built
+    '''
+    ms = importlib.reload(main_slim)
+    ms.arc_store = ArcStore() if store else None
+    ms.arc_templates = {} if templates else None
+    ms.time_span = time_span
+    ms.station_list = [str(i) for i in range(n_stations)]
+    ms.v_station_list = ['_s']
+    for i, sta in enumerate(ms.station_list):
+        if i != 0:
+            ms.v_station_list.append('_' + sta)
+        if i != n_stations - 1:
+            ms.v_station_list.append(sta + '_')
+    ms.v_station_list.append('_t')
+    rng = random.Random(seed)
+    ms.sec_times = {(ms.station_list[i], ms.station_list[i + 1]): rng.randint(3, 7) for i in range(n_stations - 1)}
+    line_plans = []
+    for _ in range(n_patterns):
+        line_plan = {sta: int(0 < i < n_stations - 1 and rng.random() < 0.5) for i, sta in enumerate(ms.station_list)}
+        line_plan[ms.station_list[0]] = line_plan[ms.station_list[-1]] = 1
+        line_plans.append(line_plan)
+    ms.train_list = [ms.create_train('G' + str(k), 10 * k, 0, 0, 350, dict(line_plans[k % n_patterns]))
+                     for k in range(n_trains)]
+    if store:
+        ms.arc_store.freeze()
+    ms.incidence = ms.build_network()
+    ms.arc_choice = ArcChoice(ms.incidence)
+    return ms
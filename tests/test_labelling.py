@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import build_instance
+from labelling import DwellTime, resource_constrained_shortest_path, train_resources
+from termination import Termination
+
+
+def test_dwell_limit_restricts_the_path():
+    ms = build_instance(store=False, templates=False)
+    train = next(train for train in ms.train_list if any(train.linePlan[sta] for sta in train.staList[1:-1]))
+    org, des = ('s_', -1), ('_t', -1)
+    min_dwell = train.min_dwellTime * sum(train.linePlan[sta] for sta in train.staList[1:-1])
+    node_passed, cost = resource_constrained_shortest_path(org, des, train, resources=[DwellTime(min_dwell)])
+    assert node_passed is not None
+    assert resource_constrained_shortest_path(org, des, train, resources=[DwellTime(min_dwell - 1)]) == \
+        (None, float('inf'))
+
+
+def test_infeasible_resource_limit_is_reported():
+    ms = build_instance(store=False, templates=False)
+    for train in ms.train_list:
+        train.resources = train_resources(train, max_dwell=0)
+    stopping = [train.traNo for train in ms.train_list if any(train.linePlan[sta] for sta in train.staList[1:-1])]
+    with pytest.raises(ValueError, match=f"train {stopping[0]} has no path within its resource limits"):
+        ms.lagrangian_relaxation(termination=Termination(0.0, 3), interval=1000)
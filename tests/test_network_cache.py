@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+from conftest import build_instance
+import main_slim
+import network_cache
+from incidence import ArcChoice
+from shortest_path import WarmStartPricing
+from termination import Termination
+
+
+def warm_start_trace(ms, max_iter=25):
+    warm_start = WarmStartPricing(ms.train_list, ms.incidence, 0.0)
+    LB, UB, gap = ms.lagrangian_relaxation(termination=Termination(0.0, max_iter), warm_start=warm_start,
+                                           interval=1000)
+    return LB, UB
+
+
+def test_reload_keeps_shared_arcs(tmp_path):
+    ms = build_instance(store=True, templates=True)
+    path = str(tmp_path / 'network.npz')
+    network_cache.save_network(path, ms.station_list, ms.v_station_list, [0] * len(ms.station_list), ms.sec_times,
+                               ms.train_list, ms.incidence)
+    templates = [None if train.template is None else train.template.traNo for train in ms.train_list]
+    reference = warm_start_trace(ms)
+
+    ms = importlib.reload(main_slim)
+    ms.station_list, ms.v_station_list, ms.miles, ms.sec_times, ms.train_list, ms.arc_store, ms.incidence = \
+        network_cache.load_network(path)
+    ms.time_span = ms.incidence.time_span
+    ms.init_nodes()
+    ms.arc_choice = ArcChoice(ms.incidence)
+    assert [None if train.template is None else train.template.traNo for train in ms.train_list] == templates
+    assert warm_start_trace(ms) == reference
+
+
+def test_cache_key_depends_on_build_flags(tmp_path):
+    path = tmp_path / 'input.csv'
+    path.write_text('a,b\n')
+    keys = {network_cache.cache_key([str(path)], time_span=100, arc_templates=templates, prune=prune)
+            for templates in (False, True) for prune in (False, True)}
+    assert len(keys) == 4
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from conftest import build_instance
+from batched_pricing import BatchedPricing
+from parallel_pricing import ParallelPricing
+from shortest_path import WarmStartPricing
+from termination import Termination
+
+
+def test_warm_start_with_tolerance_is_exact_at_reference():
+    ms = build_instance(store=False, templates=False)
+    shape = (len(ms.incidence.stations), ms.incidence.time_span)
+    warm_start = WarmStartPricing(ms.train_list, ms.incidence, 0.5)
+    warm_start.solve(np.zeros(shape))
+    multiplier = np.random.default_rng(0).random(shape)
+    solutions = warm_start.solve(multiplier)
+    reference = warm_start.reference.reshape(shape)
+    assert not np.array_equal(reference, multiplier)  # 有乘子变化在容差内，未计入
+    exact = BatchedPricing(ms.train_list, ms.incidence).solve(reference)
+    assert [cost for _, cost in solutions] == pytest.approx([cost for _, cost in exact])
+
+
+def lr_trace(store, templates, mode, max_iter=15):
+    '''
+    LB/UB traces and final feasible paths of an LR run with the given pricing mode
+    '''
+    ms = build_instance(store=store, templates=templates)
+    pricing = warm_start = None
+    if mode == 'batched':
+        pricing = BatchedPricing(ms.train_list, ms.incidence)
+    elif mode == 'parallel':
+        pricing = ParallelPricing(ms.train_list, ms.incidence, 2)
+    elif mode == 'warm_start':
+        warm_start = WarmStartPricing(ms.train_list, ms.incidence, 0.0)
+    try:
+        LB, UB, gap = ms.lagrangian_relaxation(pricing=pricing, warm_start=warm_start,
+                                               termination=Termination(0.0, max_iter), interval=1000)
+    finally:
+        if pricing is not None:
+            pricing.shutdown()
+    return LB, UB, [train.feasible_path.node_passed for train in ms.train_list]
+
+
+@pytest.mark.parametrize('store', [False, True])
+@pytest.mark.parametrize('templates', [False, True])
+@pytest.mark.parametrize('mode', ['serial', 'batched', 'parallel', 'warm_start'])
+def test_pricing_modes_give_the_same_trace(store, templates, mode):
+    LB, UB, paths = lr_trace(False, False, 'serial')
+    other_LB, other_UB, other_paths = lr_trace(store, templates, mode)
+    assert other_LB == pytest.approx(LB)
+    assert other_UB == UB
+    assert other_paths == paths
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from conftest import build_instance
+from shortest_path import dag_shortest_path
+
+
+def enumerate_path_costs(adj, arc_costs):
+    '''
+    cost of every source-sink path of a train network by depth first search, the path enumeration the DP replaced
+    '''
+    costs = []
+    stack = [(0, 0.0)]
+    while stack:
+        u, cost = stack.pop()
+        if u == adj.n_nodes - 1:
+            costs.append(cost)
+            continue
+        for e in range(adj.indptr[u], adj.indptr[u + 1]):
+            stack.append((int(adj.indices[e]), cost + arc_costs[adj.arc_ids[e]]))
+    return costs
+
+
+@pytest.mark.parametrize('store', [False, True])
+def test_dag_matches_enumeration(store):
+    ms = build_instance(n_stations=5, n_trains=3, time_span=60, store=store, templates=False)
+    arc_costs = (np.random.default_rng(1).random(len(ms.incidence.arcs)) * 10).tolist()
+    for train in ms.train_list:
+        node_passed, cost = dag_shortest_path(('s_', -1), ('_t', -1), train, arc_costs)
+        costs = enumerate_path_costs(train.adjacency(), arc_costs)
+        assert len(costs) > 1
+        assert cost == pytest.approx(min(costs))
+        assert node_passed[0] == ['s_', -1] and node_passed[-1] == ['_t', -1]
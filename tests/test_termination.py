@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+import math
+
+from conftest import build_instance
+from termination import Termination
+
+
+def test_stop_without_feasible_solution():
+    ms = build_instance(n_stations=7, n_trains=16, time_span=90, store=False, templates=False, seed=2)
+    LB, UB, gap = ms.lagrangian_relaxation(termination=Termination(0.1, 5), interval=1000)
+    assert len(UB) == 5 and all(math.isinf(ub) for ub in UB)
+    assert math.isinf(gap)
+    unscheduled = ms.get_train_timetable_from_result()
+    assert unscheduled
+    for train in ms.train_list:
+        assert (train.traNo in unscheduled) == (not train.timetable)